@@ -3,15 +3,19 @@ import time
 from http import HTTPStatus
 from typing import List, Optional
 
+from core.config import settings
+from core.http_cache import cached_json_response
 from core.jwt import security_jwt
-from fastapi import APIRouter, Depends, HTTPException, Query
-from models.film import Film, FilmDetailed
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from models.film import Film, FilmBatchRequest, FilmDetailed, FilmProjection
 from services.film import (
+    FILM_PROJECTION_FIELDS,
     FilmService,
     MultipleFilmsService,
     get_film_service,
     get_multiple_films_service,
 )
+from services.pagination import NEXT_CURSOR_HEADER
 from typing_extensions import Annotated
 
 # Define the cutoff date for unauthorized users
@@ -22,6 +26,40 @@ THREE_YEARS_AGO = datetime.datetime.now(datetime.timezone.utc) - datetime.timede
 # Объект router, в котором регистрируем обработчики
 router = APIRouter()
 
+FIELDS_DESCRIPTION = "Extra film fields to return, comma separated: " + ",".join(
+    sorted(FILM_PROJECTION_FIELDS)
+)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """Разобрать параметр fields в отсортированный список дополнительных полей."""
+    if not fields:
+        return None
+    names = sorted({name.strip() for name in fields.split(",") if name.strip()})
+    unknown = [name for name in names if name not in FILM_PROJECTION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return names or None
+
+
+def to_projections(
+    films: Optional[list[Film | dict]], fields: Optional[list[str]]
+) -> List[FilmProjection]:
+    """Элементы списка для ответа без незапрошенных полей.
+
+    Поля Film задаются явно (и None тоже), поэтому при исключении
+    незаданных полей пропадают только дополнительные поля, которых нет в fields.
+    """
+    names = list(Film.model_fields) + list(fields or [])
+    projections = []
+    for film in films or []:
+        data = film if isinstance(film, dict) else film.model_dump()
+        projections.append(FilmProjection(**{name: data.get(name) for name in names}))
+    return projections
+
 
 @router.get(
     "/",
@@ -30,6 +68,7 @@ router = APIRouter()
 )
 async def get_popular_films(
     user: Annotated[dict, Depends(security_jwt)],
+    response: Response,
     similar: Optional[str] = Query(
         None, description="Get films of same genre as similar"
     ),
@@ -37,6 +76,12 @@ async def get_popular_films(
     sort: str = Query("-imdb_rating", description="Sort by field"),
     page_size: int = Query(10, description="Number of items per page", ge=1),
     page_number: int = Query(1, description="Page number", ge=1),
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor pagination: empty value starts a scan, "
+        f"next cursor is returned in {NEXT_CURSOR_HEADER} header",
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     film_service: MultipleFilmsService = Depends(get_multiple_films_service),
 ):
     valid_sort_fields = ("imdb_rating", "-imdb_rating")
@@ -47,9 +92,24 @@ async def get_popular_films(
         )
 
     desc = sort.startswith("-")
+    extra_fields = parse_fields(fields)
 
     # Adjust query filters based on authorization
     release_date_cutoff = None if user else THREE_YEARS_AGO
+    if cursor is not None:
+        popular_films, next_cursor = await film_service.get_multiple_films_by_cursor(
+            cursor=cursor,
+            desc_order=desc,
+            page_size=page_size,
+            genre=genre,
+            similar=similar,
+            release_date_cutoff=release_date_cutoff,
+            fields=extra_fields,
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return popular_films
+
     popular_films = await film_service.get_multiple_films(
         similar=similar,
         genre=genre,
@@ -57,6 +117,7 @@ async def get_popular_films(
         page_size=page_size,
         page_number=page_number,
         release_date_cutoff=release_date_cutoff,
+        fields=extra_fields,
     )
     return popular_films
 
@@ -67,27 +128,68 @@ async def get_popular_films(
 
 @router.get(
     "/search",
-    response_model=List[Film],
+    response_model=List[FilmProjection],
+    response_model_exclude_unset=True,
     summary="Поиск фильма по наименованию",
     description="Запрос должен содержать наименование фильма, количество фильмов на странице и номер страницы",
 )
 async def fulltext_search_filmworks(
     user: Annotated[dict, Depends(security_jwt)],
+    response: Response,
     query: str = Query("Star", description="Film title or part of film title"),
     page_size: int = Query(50, description="Number of items per page", ge=1),
     page_number: int = Query(1, description="Page number", ge=1),
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor pagination: empty value starts a scan, "
+        f"next cursor is returned in {NEXT_CURSOR_HEADER} header",
+    ),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     pop_film_service: MultipleFilmsService = Depends(get_multiple_films_service),
-) -> List[Film]:
+) -> List[FilmProjection]:
+    extra_fields = parse_fields(fields)
+    if cursor is not None:
+        search_films, next_cursor = await pop_film_service.search_films_by_cursor(
+            query, cursor, page_size, fields=extra_fields
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return to_projections(search_films, extra_fields)
 
     search_films = await pop_film_service.search_films(
         query,
         page_number,
         page_size,
+        fields=extra_fields,
     )
-    return search_films
+    return to_projections(search_films, extra_fields)
+
+
+# 4. Полная информация по нескольким фильмам (например, для списка "смотреть позже")
+# POST /api/v1/films/batch {"uuids": ["...", "..."]}
+
+
+@router.post(
+    "/batch",
+    response_model=List[FilmDetailed],
+    summary="Запрос нескольких фильмов по id",
+    description="Полная информация о нескольких фильмах за один запрос. Ненайденные фильмы пропускаются",
+)
+async def films_batch(
+    user: Annotated[dict, Depends(security_jwt)],
+    batch: FilmBatchRequest,
+    film_service: FilmService = Depends(get_film_service),
+) -> List[FilmDetailed]:
+    if not batch.uuids or len(batch.uuids) > settings.films_batch_max_size:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"From 1 to {settings.films_batch_max_size} uuids are allowed",
+        )
 
+    return await film_service.get_many_by_uuid(batch.uuids)
 
-# 4. Полная информация по фильму (т.з. 3.1.)
+
+# 5. Полная информация по фильму (т.з. 3.1.)
 
 
 # Внедряем FilmService с помощью Depends(get_film_service)
@@ -99,11 +201,15 @@ async def fulltext_search_filmworks(
 )
 async def film_details(
     user: Annotated[dict, Depends(security_jwt)],
+    request: Request,
     film_uuid: str,
     film_service: FilmService = Depends(get_film_service),
-) -> FilmDetailed:
-
-    film = await film_service.get_by_uuid(film_uuid)
+) -> Response:
+    # JSON фильма берётся из кеша как есть; ETag считается по нему же,
+    # поэтому повторный запрос с If-None-Match получает 304 без тела
+    film = await film_service.get_json_by_uuid(film_uuid)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Film not found")
-    return film
+    return cached_json_response(
+        request, film, max_age=settings.http_cache_max_age, private=True
+    )
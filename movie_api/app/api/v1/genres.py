@@ -1,8 +1,10 @@
 from http import HTTPStatus
 from typing import Optional
 
+from core.config import settings
+from core.http_cache import cached_json_response
 from core.jwt import security_jwt
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from models.genre import Genre, GenrePaginationResponse, SortOrder
 from services.genre import GenreService, get_genre_service
 from typing_extensions import Annotated
@@ -13,13 +15,16 @@ router = APIRouter()
 @router.get("/{genre_id}", response_model=Genre, summary="Запрос жанра по id")
 async def genre_details(
     user: Annotated[dict, Depends(security_jwt)],
+    request: Request,
     genre_id: str,
     genre_service: GenreService = Depends(get_genre_service),
-) -> Genre:
-    genre = await genre_service.get_by_uuid(genre_id)
+) -> Response:
+    genre = await genre_service.get_json_by_uuid(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Genre not found")
-    return genre
+    return cached_json_response(
+        request, genre, max_age=settings.http_cache_max_age, private=True
+    )
 
 
 @router.get(
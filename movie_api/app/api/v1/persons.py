@@ -1,10 +1,13 @@
 import time
 from http import HTTPStatus
-from typing import List
+from typing import List, Optional
 
+from core.config import settings
+from core.http_cache import cached_json_response
 from core.jwt import security_jwt
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from models.person import FilmRating, PersonFilm
+from services.pagination import NEXT_CURSOR_HEADER
 from services.person import PersonService, get_person_service
 from typing_extensions import Annotated
 
@@ -15,20 +18,34 @@ router = APIRouter()
     "/search", response_model=list[PersonFilm], summary="Поиск персоны по имени"
 )
 async def persons_search(
+    response: Response,
     query: str = Query("", description="Get Persons by names"),
     page_size: int = Query(
         default=10, description="Number of items per page", gt=0, lt=100
     ),
     page_number: int = Query(default=1, description="Page number", gt=0, lt=1000),
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor pagination: empty value starts a scan, "
+        f"next cursor is returned in {NEXT_CURSOR_HEADER} header",
+    ),
     person_service: PersonService = Depends(get_person_service),
 ) -> List[PersonFilm]:
-    persons = await person_service.search(
-        search_str=query,
-        page_size=page_size,
-        page_number=page_number,
-    )
+    if cursor is not None:
+        persons, next_cursor = await person_service.search_by_cursor(
+            search_str=query, cursor=cursor, page_size=page_size
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    else:
+        persons = await person_service.search(
+            search_str=query,
+            page_size=page_size,
+            page_number=page_number,
+        )
 
-    if not persons:
+    # Пустая последняя страница при проходе по курсору - не ошибка
+    if not persons and not cursor:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Person not found")
     return persons
 
@@ -38,13 +55,16 @@ async def persons_search(
 )
 async def person_details(
     user: Annotated[dict, Depends(security_jwt)],
+    request: Request,
     person_id: str,
     person_service: PersonService = Depends(get_person_service),
-) -> PersonFilm:
-    person = await person_service.get_by_uuid(person_id)
+) -> Response:
+    person = await person_service.get_json_by_uuid(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Person not found")
-    return person
+    return cached_json_response(
+        request, person, max_age=settings.http_cache_max_age, private=True
+    )
 
 
 @router.get(
@@ -0,0 +1,30 @@
+from core.config import settings
+from fastapi import APIRouter, Depends, Query
+from models.suggestion import Suggestions
+from services.suggestion import SuggestService, get_suggest_service
+
+router = APIRouter()
+
+
+# Подсказки при наборе в строке поиска
+# GET /api/v1/suggest?prefix=sta&size=5
+
+
+@router.get(
+    "",
+    response_model=Suggestions,
+    summary="Подсказки по началу названия фильма и имени персоны",
+    description="Предназначен для запросов на каждое нажатие клавиши: "
+    "ищет по префиксу, а не полнотекстово",
+)
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Typed prefix"),
+    size: int = Query(
+        5,
+        ge=1,
+        le=settings.suggest_max_size,
+        description="Number of films and of persons",
+    ),
+    suggest_service: SuggestService = Depends(get_suggest_service),
+) -> Suggestions:
+    return await suggest_service.suggest(prefix=prefix, size=size)
@@ -1,5 +1,6 @@
 import os
 from logging import config as logging_config
+from typing import Optional
 
 from core.logger import LOGGING
 from pydantic import Field
@@ -16,12 +17,71 @@ class Settings(BaseSettings):
     # Настройки Redis
     redis_host: str = Field("127.0.0.1", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
+    # Пул соединений воркера: размер, ожидание свободного соединения (сек.)
+    # и таймаут операций с сокетом
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout: float = Field(5.0, alias="REDIS_POOL_TIMEOUT")
+    redis_socket_timeout: Optional[float] = Field(None, alias="REDIS_SOCKET_TIMEOUT")
 
     # Настройки Elastic
     elastic_host: str = Field("127.0.0.1", alias="ELASTIC_HOST")
     elastic_port: int = Field(9200, alias="ELASTIC_PORT")
     elastic_schema: str = "http://"
-    cache_time_life: int = 60 * 60
+    # Профиль транспорта клиента ES: соединений на узел, сжатие gzip,
+    # таймауты и повторы запросов
+    # и выбор узла (round_robin | random), а также sniffing узлов кластера
+    es_connections_per_node: int = Field(10, alias="ES_CONNECTIONS_PER_NODE")
+    es_http_compress: bool = Field(False, alias="ES_HTTP_COMPRESS")
+    es_request_timeout: float = Field(10.0, alias="ES_REQUEST_TIMEOUT")
+    es_max_retries: int = Field(3, alias="ES_MAX_RETRIES")
+    es_retry_on_timeout: bool = Field(True, alias="ES_RETRY_ON_TIMEOUT")
+    es_node_selector: str = Field("round_robin", alias="ES_NODE_SELECTOR")
+    es_sniff_on_start: bool = Field(False, alias="ES_SNIFF_ON_START")
+    es_sniff_on_node_failure: bool = Field(False, alias="ES_SNIFF_ON_NODE_FAILURE")
+    # Время жизни point-in-time между запросами страниц по курсору
+    es_pit_keep_alive: str = Field("1m", alias="ES_PIT_KEEP_ALIVE")
+    # Срок жизни записей кеша; изменённые в ETL данные сбрасываются по событию
+    cache_time_life: int = Field(60 * 60, alias="CACHE_TIME_LIFE")
+    # Подсказки при наборе: размер выдачи и in-process кеш коротких префиксов
+    # (не длиннее SUGGEST_CACHE_PREFIX_LEN символов)
+    suggest_max_size: int = Field(10, alias="SUGGEST_MAX_SIZE")
+    suggest_cache_prefix_len: int = Field(3, alias="SUGGEST_CACHE_PREFIX_LEN")
+    suggest_cache_max_items: int = Field(5_000, alias="SUGGEST_CACHE_MAX_ITEMS")
+    suggest_cache_ttl: int = Field(60, alias="SUGGEST_CACHE_TTL")
+    # max-age в Cache-Control ответов с ETag, секунды
+    http_cache_max_age: int = Field(60, alias="HTTP_CACHE_MAX_AGE")
+    # Максимальное количество фильмов в одном batch-запросе
+    films_batch_max_size: int = Field(100, alias="FILMS_BATCH_MAX_SIZE")
+
+    # Настройки in-process (L1) кеша
+    cache_l1_enabled: bool = Field(True, alias="CACHE_L1_ENABLED")
+    cache_l1_ttl: int = Field(30, alias="CACHE_L1_TTL")
+    cache_l1_max_items: int = Field(10_000, alias="CACHE_L1_MAX_ITEMS")
+    cache_l1_max_bytes: int = Field(64 * 1024 * 1024, alias="CACHE_L1_MAX_BYTES")
+
+    # Stale-while-revalidate: сколько ещё секунд после мягкого TTL можно отдавать
+    # устаревшее значение и коэффициент XFetch для раннего обновления (0 - выкл.)
+    cache_stale_time_life: int = Field(10 * 60, alias="CACHE_STALE_TIME_LIFE")
+    cache_xfetch_beta: float = Field(1.0, alias="CACHE_XFETCH_BETA")
+
+    # Поток Redis, в который ETL пишет id изменённых фильмов, жанров и персон
+    cache_invalidation_enabled: bool = Field(True, alias="CACHE_INVALIDATION_ENABLED")
+    cache_invalidation_stream: str = Field(
+        "cache:invalidation", alias="CACHE_INVALIDATION_STREAM"
+    )
+
+    # Сжатие значений в Redis: none | zstd | lz4.
+    # Сжимаются только значения не короче CACHE_COMPRESS_MIN_SIZE байт
+    cache_compression: str = Field("none", alias="CACHE_COMPRESSION")
+    cache_compress_min_size: int = Field(1024, alias="CACHE_COMPRESS_MIN_SIZE")
+
+    # Prometheus: границы корзин гистограмм задержки (сек.) и доля запросов,
+    # для которых записывается задержка (счётчик запросов ведётся для всех)
+    metrics_latency_buckets: list[float] = Field(
+        [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+        alias="METRICS_LATENCY_BUCKETS",
+    )
+    metrics_sample_rate: float = Field(1.0, alias="METRICS_SAMPLE_RATE")
 
     # Tracing
     enable_tracing: bool = Field(default=True, env="ENABLE_TRACING")
@@ -37,6 +97,8 @@ class Settings(BaseSettings):
         alias="SECRET_KEY",
     )
     algorithm: str = Field(default="HS256", alias="ALGORITHM")
+    # Сколько проверенных токенов держать в памяти воркера (0 - не кешировать)
+    jwt_cache_max_items: int = Field(default=10_000, alias="JWT_CACHE_MAX_ITEMS")
 
 
 # Применяем настройки логирования
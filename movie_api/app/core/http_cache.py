@@ -0,0 +1,45 @@
+import hashlib
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(payload: bytes) -> str:
+    """ETag по содержимому ответа: одинаковый во всех воркерах и после рестарта."""
+    return '"{0}"'.format(hashlib.blake2b(payload, digest_size=16).hexdigest())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match.
+
+    Сравнение слабое (RFC 9110, 13.1.2): nginx, сжимая ответ gzip,
+    превращает ETag в слабый (W/"..."), и клиент присылает его обратно.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def cached_json_response(
+    request: Request, payload: str | bytes, max_age: int, private: bool
+) -> Response:
+    """Ответ с готовым JSON, ETag и Cache-Control; 304, если у клиента та же версия.
+
+    private - ответ эндпойнта под авторизацией: его можно хранить в кеше
+    клиента, но не в общих кешах (nginx, CDN), иначе они отдадут его без
+    проверки токена.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    headers = {
+        "ETag": make_etag(payload),
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
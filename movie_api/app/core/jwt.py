@@ -1,21 +1,74 @@
+import hashlib
 import http
 import time
+from collections import OrderedDict
 from typing import Optional
 
 from core.config import settings
+from core.metrics import cache_requests_total
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
 
 
+class TokenCache:
+    """LRU-кеш проверенных токенов: хеш токена -> claims до его exp.
+
+    Один и тот же токен приходит много раз за время жизни, а проверка
+    подписи и разбор JSON в jose заметно дороже поиска в словаре.
+    Храним хеш, а не сам токен, чтобы не держать в памяти учётные данные.
+    Кешируются только действительные токены.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._entries: OrderedDict[bytes, dict] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        claims = self._entries.get(key)
+        if claims is None:
+            return None
+        if claims["exp"] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        if self.max_items <= 0:
+            return
+        self._entries[self._key(token)] = claims
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+
+token_cache = TokenCache(max_items=settings.jwt_cache_max_items)
+
+
 def decode_token(token: str) -> Optional[dict]:
+    decoded_token = token_cache.get(token)
+    if decoded_token is not None:
+        cache_requests_total.labels(tier="jwt", result="hit").inc()
+        return decoded_token
+    cache_requests_total.labels(tier="jwt", result="miss").inc()
     try:
         decoded_token = jwt.decode(
             token, settings.secret_key, algorithms=[settings.algorithm]
         )
-        return decoded_token if decoded_token["exp"] >= time.time() else None
+        if decoded_token["exp"] < time.time():
+            return None
     except Exception:
         return None
+    token_cache.set(token, decoded_token)
+    return decoded_token
 
 
 class JWTBearer(HTTPBearer):
@@ -1,164 +1,118 @@
-import re
-from typing import Callable
-
-from prometheus_client import Counter, Histogram
-from prometheus_fastapi_instrumentator.metrics import Info
+import random
+import time
+
+from core.config import settings
+from prometheus_client import Counter, Gauge, Histogram
+
+# Метрики HTTP-запросов: эндпойнт определяется по шаблону пути маршрута,
+# который FastAPI кладёт в scope, поэтому число меток ограничено
+http_requests_total = Counter(
+    "http_requests_total",
+    "Total number of HTTP requests by route template, method and status",
+    ["route", "method", "status"],
+)
 
-# Счётчики для запросов к эндпоинтам фильмов
-film_requests_total = Counter(
-    "film_requests_total",
-    "Total number of film-related requests",
-    ["endpoint", "method"],
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template (sampled)",
+    ["route", "method"],
+    buckets=settings.metrics_latency_buckets,
 )
 
-film_requests_total.labels(endpoint="/films/popular", method="GET")
-film_requests_total.labels(endpoint="/films/search", method="GET")
-film_requests_total.labels(endpoint="/films/{film_uuid}", method="GET")
+# Метрики кеша
+cache_requests_total = Counter(
+    "cache_requests_total",
+    "Total number of cache lookups by tier and result",
+    ["tier", "result"],
+)
 
-film_5xx_errors_total = Counter(
-    "film_5xx_errors_total",
-    "Total number of 5xx errors for film endpoints",
-    ["endpoint", "method", "status_code"],
+cache_l1_size_bytes = Gauge(
+    "cache_l1_size_bytes",
+    "Estimated memory used by the in-process L1 cache",
 )
 
-film_5xx_errors_total.labels(
-    endpoint="/films/popular", method="GET", status_code="500"
-).inc()
-film_5xx_errors_total.labels(
-    endpoint="/films/search", method="GET", status_code="500"
-).inc()
-film_5xx_errors_total.labels(
-    endpoint="/films/{film_uuid}", method="GET", status_code="500"
-).inc()
-
-
-film_request_duration_seconds = Histogram(
-    "film_request_duration_seconds",
-    "Duration of films requests",
-    ["endpoint", "method"],
+singleflight_coalesced_waiters_total = Counter(
+    "singleflight_coalesced_waiters_total",
+    "Total number of cache misses that awaited an in-flight fetch",
 )
 
-film_request_duration_seconds.labels(endpoint="/films/popular", method="GET")
-film_request_duration_seconds.labels(endpoint="/films/search", method="GET")
-film_request_duration_seconds.labels(endpoint="/films/{film_uuid}", method="GET")
+redis_pool_connections = Gauge(
+    "redis_pool_connections",
+    "Connections of the worker Redis pool by state",
+    ["state"],
+)
 
-# Счётчики для запросов к персональным эндпоинтам
-person_requests_total = Counter(
-    "person_requests_total",
-    "Total number of person-related requests",
-    ["endpoint", "method"],
+redis_pool_max_connections = Gauge(
+    "redis_pool_max_connections",
+    "Maximum size of the worker Redis pool",
 )
 
-person_requests_total.labels(endpoint="/persons/search", method="GET")
-person_requests_total.labels(endpoint="/persons/{person_id}", method="GET")
-person_requests_total.labels(endpoint="/persons/{person_id}/film", method="GET")
+# Метрики клиента Elasticsearch по узлам кластера
+es_requests_in_flight = Gauge(
+    "es_requests_in_flight",
+    "Elasticsearch requests currently in progress, by node",
+    ["node"],
+)
 
-person_5xx_errors_total = Counter(
-    "person_5xx_errors_total",
-    "Total number of 5xx errors for person endpoints",
-    ["endpoint", "method", "status_code"],
+es_requests_queued = Gauge(
+    "es_requests_queued",
+    "Elasticsearch requests waiting for a free pooled connection, by node",
+    ["node"],
 )
 
-person_5xx_errors_total.labels(
-    endpoint="/persons/search", method="GET", status_code="500"
-).inc()
-person_5xx_errors_total.labels(
-    endpoint="/persons/{person_id}", method="GET", status_code="500"
-).inc()
-person_5xx_errors_total.labels(
-    endpoint="/persons/{person_id}/film", method="GET", status_code="500"
-).inc()
-
-person_request_duration_seconds = Histogram(
-    "person_request_duration_seconds",
-    "Duration of persons requests",
-    ["endpoint", "method"],
+es_request_duration_seconds = Histogram(
+    "es_request_duration_seconds",
+    "Elasticsearch request latency, by node",
+    ["node"],
+    buckets=settings.metrics_latency_buckets,
 )
 
-person_request_duration_seconds.labels(endpoint="/persons/search", method="GET")
-person_request_duration_seconds.labels(endpoint="/persons/{person_id}", method="GET")
-person_request_duration_seconds.labels(
-    endpoint="/persons/{person_id}/film", method="GET"
+cache_invalidations_total = Counter(
+    "cache_invalidations_total",
+    "Total number of entity ids received on the cache invalidation stream",
+    ["entity"],
 )
 
 
-def instrument_person() -> Callable[[Info], None]:
-    def instrumentation(info: Info) -> None:
-        person_endpoint_patterns = {
-            "/persons/search": r"^/persons/search$",
-            "/persons/{person_id}": r"^/persons/[^/]+$",
-            "/persons/{person_id}/film": r"^/persons/[^/]+/film/$",
-        }
+# Путь запроса, не совпавшего ни с одним маршрутом: сами пути в метки не
+# попадают, иначе сканирование несуществующих адресов раздувает метрики
+UNMATCHED_ROUTE = "<unmatched>"
 
-        if info.request.method not in ["GET"]:
-            return
 
-        matched_endpoint = None
-
-        for endpoint, pattern in person_endpoint_patterns.items():
-            if re.match(pattern, info.request.url.path):
-                matched_endpoint = endpoint
-                break
-
-        if matched_endpoint:
-            # Счётчик всех запросов по персональным эндпоинтам
-            person_requests_total.labels(
-                endpoint=matched_endpoint, method=info.request.method
-            ).inc()
-
-            # Засекаем время выполнения
-            person_request_duration_seconds.labels(
-                endpoint=matched_endpoint, method=info.request.method
-            ).observe(info.modified_duration)
-
-            # Счётчик 5xx ошибок, если есть
-            if 500 <= info.response.status_code < 600:
-                person_5xx_errors_total.labels(
-                    endpoint=matched_endpoint,
-                    method=info.request.method,
-                    status_code=str(info.response.status_code),
-                ).inc()
-
-    return instrumentation
-
-
-def instrument_film() -> Callable[[Info], None]:
-    def instrumentation(info: Info) -> None:
-        film_endpoint_patterns = {
-            "/films/popular": re.compile(r"^/api/v1/films/$"),
-            "/films/search": re.compile(r"^/api/v1/films/search$"),
-            "/films/{film_uuid}": re.compile(
-                r"^/api/v1/films/[^/]+$"
-            ),  # Полная информация по фильму
-        }
-
-        if info.request.method not in ["GET"]:
+class MetricsMiddleware:
+    """ASGI-middleware: число запросов и задержка по шаблону маршрута.
+
+    Счётчик запросов ведётся для каждого запроса, а задержка - для доли
+    sample_rate запросов, чтобы снизить накладные расходы под нагрузкой.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
             return
 
-        matched_endpoint = None
-
-        for endpoint, pattern in film_endpoint_patterns.items():
-            if pattern.match(info.request.url.path):
-                matched_endpoint = endpoint
-                break
-
-        if matched_endpoint:
-            # Считаем общее количество запросов
-            film_requests_total.labels(
-                endpoint=matched_endpoint, method=info.request.method
-            ).inc()
-
-            # Засекаем время выполнения
-            film_request_duration_seconds.labels(
-                endpoint=matched_endpoint, method=info.request.method
-            ).observe(info.modified_duration)
-
-            # Считаем ошибки 5xx, если есть
-            if 500 <= info.response.status_code < 600:
-                film_5xx_errors_total.labels(
-                    endpoint=matched_endpoint,
-                    method=info.request.method,
-                    status_code=str(info.response.status_code),
-                ).inc()
-
-    return instrumentation
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        started = time.perf_counter() if sampled else 0.0
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            template = route.path if route is not None else UNMATCHED_ROUTE
+            method = scope["method"]
+            http_requests_total.labels(template, method, status).inc()
+            if sampled:
+                http_request_duration_seconds.labels(template, method).observe(
+                    time.perf_counter() - started
+                )
@@ -1,9 +1,64 @@
+import time
 from typing import Optional
 
+from core.config import settings
+from core.metrics import (
+    es_request_duration_seconds,
+    es_requests_in_flight,
+    es_requests_queued,
+)
+from elastic_transport import AiohttpHttpNode
 from elasticsearch import AsyncElasticsearch
 
 es: Optional[AsyncElasticsearch] = None
 
 
+class InstrumentedAiohttpHttpNode(AiohttpHttpNode):
+    """Узел ES с метриками занятости пула соединений и задержки запросов.
+
+    Запросы сверх connections_per_node ждут свободного соединения внутри
+    aiohttp и учитываются как стоящие в очереди.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._in_flight = 0
+
+    def _set_in_flight(self, delta: int) -> None:
+        self._in_flight += delta
+        es_requests_in_flight.labels(node=self.base_url).set(self._in_flight)
+        es_requests_queued.labels(node=self.base_url).set(
+            max(0, self._in_flight - settings.es_connections_per_node)
+        )
+
+    async def perform_request(self, *args, **kwargs):
+        self._set_in_flight(1)
+        started = time.perf_counter()
+        try:
+            return await super().perform_request(*args, **kwargs)
+        finally:
+            es_request_duration_seconds.labels(node=self.base_url).observe(
+                time.perf_counter() - started
+            )
+            self._set_in_flight(-1)
+
+
+def create_search_engine() -> AsyncElasticsearch:
+    return AsyncElasticsearch(
+        hosts=[
+            f"{settings.elastic_schema}{settings.elastic_host}:{settings.elastic_port}"
+        ],
+        node_class=InstrumentedAiohttpHttpNode,
+        connections_per_node=settings.es_connections_per_node,
+        http_compress=settings.es_http_compress,
+        request_timeout=settings.es_request_timeout,
+        max_retries=settings.es_max_retries,
+        retry_on_timeout=settings.es_retry_on_timeout,
+        node_selector_class=settings.es_node_selector,
+        sniff_on_start=settings.es_sniff_on_start,
+        sniff_on_node_failure=settings.es_sniff_on_node_failure,
+    )
+
+
 async def get_search_engine() -> AsyncElasticsearch | None:
     return es
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Callable, Optional
 
 
 class AsyncSearchEngine(ABC):
@@ -21,6 +21,54 @@ class AsyncCache(ABC):
     async def set(self, **kwargs) -> None:
         pass
 
+    async def get_model(self, key: str, loader: Callable[[str], Any]) -> Any:
+        """Получить значение из кеша и сразу десериализовать его через loader."""
+        value = await self.get(key)
+        return loader(value) if value else None
+
+    async def get_many(self, keys: list[str]) -> list[Optional[str]]:
+        """Получить несколько значений; для отсутствующих ключей - None."""
+        return [await self.get(key) for key in keys]
+
+    async def get_many_with_ttl(
+        self, keys: list[str]
+    ) -> list[tuple[Optional[str], Optional[float]]]:
+        """Значения вместе с оставшимся временем жизни в секундах.
+
+        None вместо времени жизни - срок неизвестен или не ограничен.
+        """
+        return [(value, None) for value in await self.get_many(keys)]
+
+    async def get_many_models(
+        self, keys: list[str], loader: Callable[[str], Any]
+    ) -> list[Any]:
+        values = await self.get_many(keys)
+        return [loader(value) if value else None for value in values]
+
+    async def set_many(self, mapping: dict[str, str | bytes], ex: int) -> None:
+        for key, value in mapping.items():
+            await self.set(key, value, ex)
+
+    async def get_range(
+        self, key: str, start: int, stop: int, desc: bool = True
+    ) -> list[str]:
+        """Элементы отсортированного множества с позиции start по stop включительно."""
+        raise NotImplementedError
+
+    async def delete(self, keys: list[str]) -> None:
+        raise NotImplementedError
+
+    async def set_with_tags(
+        self, key: str, value: str | bytes, tags: list[str], ex: int
+    ) -> None:
+        """Сохранить значение и отметить ключ тегами (например, id сущностей
+        на странице списка) одной операцией."""
+        raise NotImplementedError
+
+    async def invalidate_tags(self, tags: list[str]) -> list[str]:
+        """Удалить все ключи, отмеченные любым из тегов; вернуть удалённые ключи."""
+        raise NotImplementedError
+
     @abstractmethod
     async def generate_cache_key(self, **kwargs):
         pass
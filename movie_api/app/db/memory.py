@@ -0,0 +1,233 @@
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from core.config import settings
+from core.metrics import cache_l1_size_bytes, cache_requests_total
+from db.interfaces import AsyncCache
+from prometheus_client import Gauge
+
+# Десериализованный объект в среднем занимает больше памяти, чем исходный JSON,
+# поэтому при учёте бюджета L1 считаем его с запасом.
+PARSED_OBJECT_SIZE_FACTOR = 2
+
+
+@dataclass
+class CacheEntry:
+    """Запись in-process кеша."""
+
+    value: str
+    expires_at: float
+    size: int
+    loader: Optional[Callable] = None
+    parsed: Any = field(default=None)
+
+
+class LRUCache:
+    """Ограниченный по числу записей и по памяти LRU-кеш с TTL.
+
+    Работает в рамках одного event loop, поэтому не требует блокировок.
+    Занятая память публикуется в size_gauge (по умолчанию - метрика L1).
+    """
+
+    def __init__(
+        self,
+        max_items: int,
+        max_bytes: int,
+        size_gauge: Optional[Gauge] = cache_l1_size_bytes,
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size_gauge = size_gauge
+        self.size_bytes = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.delete(key)
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self._entries[key] = CacheEntry(
+            value=value, expires_at=time.monotonic() + ttl, size=size
+        )
+        self.size_bytes += size
+        self._evict()
+
+    def remember_parsed(self, key: str, loader: Callable, parsed: Any) -> None:
+        """Сохранить в записи уже провалидированный объект."""
+        entry = self._entries.get(key)
+        if entry is None or entry.loader is not None:
+            return
+        extra = entry.size * PARSED_OBJECT_SIZE_FACTOR
+        entry.loader, entry.parsed = loader, parsed
+        entry.size += extra
+        self.size_bytes += extra
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_items or self.size_bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self.size_bytes -= entry.size
+        if self.size_gauge is not None:
+            self.size_gauge.set(self.size_bytes)
+
+
+class TwoTierCache(AsyncCache):
+    """Двухуровневый кеш: in-process LRU (L1) поверх сетевого кеша (L2).
+
+    L1 хранит записи не дольше `l1_ttl` секунд, чтобы ограничить время,
+    в течение которого разные воркеры могут отдавать разные версии данных.
+    """
+
+    def __init__(self, l1: LRUCache, l2: AsyncCache, l1_ttl: int):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.l1.get(key)
+        if value is not None:
+            cache_requests_total.labels(tier="l1", result="hit").inc()
+            return value
+        cache_requests_total.labels(tier="l1", result="miss").inc()
+
+        ((value, ttl),) = await self.l2.get_many_with_ttl([key])
+        cache_requests_total.labels(
+            tier="l2", result="hit" if value is not None else "miss"
+        ).inc()
+        if value is not None:
+            self.l1.set(key, value, self._l1_ttl(ttl))
+        return value
+
+    def _l1_ttl(self, l2_ttl: Optional[float]) -> float:
+        # Запись из L2 не должна пережить в L1 свой срок в Redis
+        return self.l1_ttl if l2_ttl is None else min(self.l1_ttl, l2_ttl)
+
+    async def get_model(self, key: str, loader: Callable[[str], Any]) -> Any:
+        entry = self.l1.get_entry(key)
+        if entry is not None and entry.loader == loader:
+            cache_requests_total.labels(tier="l1", result="hit").inc()
+            return entry.parsed
+
+        value = await self.get(key)
+        if value is None:
+            return None
+        parsed = loader(value)
+        self.l1.remember_parsed(key, loader, parsed)
+        return parsed
+
+    async def get_many_models(
+        self, keys: list[str], loader: Callable[[str], Any]
+    ) -> list[Any]:
+        results: list[Any] = [None] * len(keys)
+        missed: dict[str, int] = {}
+        for position, key in enumerate(keys):
+            entry = self.l1.get_entry(key)
+            if entry is not None and entry.loader == loader:
+                results[position] = entry.parsed
+            elif entry is not None:
+                results[position] = loader(entry.value)
+                self.l1.remember_parsed(key, loader, results[position])
+            else:
+                missed[key] = position
+        cache_requests_total.labels(tier="l1", result="hit").inc(
+            len(keys) - len(missed)
+        )
+        cache_requests_total.labels(tier="l1", result="miss").inc(len(missed))
+        if not missed:
+            return results
+
+        values = await self.l2.get_many_with_ttl(list(missed))
+        for (key, position), (value, ttl) in zip(missed.items(), values):
+            cache_requests_total.labels(
+                tier="l2", result="hit" if value is not None else "miss"
+            ).inc()
+            if value is None:
+                continue
+            self.l1.set(key, value, self._l1_ttl(ttl))
+            results[position] = loader(value)
+            self.l1.remember_parsed(key, loader, results[position])
+        return results
+
+    async def set(self, key: str, value: str | bytes, ex: int) -> None:
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        await self.l2.set(key, value, ex=ex)
+        self.l1.set(key, value, min(ex, self.l1_ttl))
+
+    async def set_many(self, mapping: dict[str, str | bytes], ex: int) -> None:
+        mapping = {
+            key: value.decode("utf-8") if isinstance(value, bytes) else value
+            for key, value in mapping.items()
+        }
+        await self.l2.set_many(mapping, ex=ex)
+        for key, value in mapping.items():
+            self.l1.set(key, value, min(ex, self.l1_ttl))
+
+    async def get_range(
+        self, key: str, start: int, stop: int, desc: bool = True
+    ) -> list[str]:
+        return await self.l2.get_range(key, start, stop, desc=desc)
+
+    async def delete(self, keys: list[str]) -> None:
+        for key in keys:
+            self.l1.delete(key)
+        await self.l2.delete(keys)
+
+    async def set_with_tags(
+        self, key: str, value: str | bytes, tags: list[str], ex: int
+    ) -> None:
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        await self.l2.set_with_tags(key, value, tags, ex=ex)
+        self.l1.set(key, value, min(ex, self.l1_ttl))
+
+    async def invalidate_tags(self, tags: list[str]) -> list[str]:
+        keys = await self.l2.invalidate_tags(tags)
+        for key in keys:
+            self.l1.delete(key)
+        return keys
+
+    def generate_cache_key(self, index: str, params_to_key: dict) -> str:
+        return self.l2.generate_cache_key(index=index, params_to_key=params_to_key)
+
+    async def close(self):
+        self.l1.clear()
+        await self.l2.close()
+
+
+# Общий для всех запросов воркера L1-кеш
+l1_cache = LRUCache(
+    max_items=settings.cache_l1_max_items,
+    max_bytes=settings.cache_l1_max_bytes,
+)
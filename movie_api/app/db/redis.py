@@ -1,23 +1,121 @@
+import time
 from typing import Optional
 
 from core.config import settings
+from core.metrics import redis_pool_connections, redis_pool_max_connections
 from db.interfaces import AsyncCache
-from redis.asyncio import Redis
+from db.memory import TwoTierCache, l1_cache
+from db.serializer import CacheSerializer
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.asyncio.connection import AbstractConnection
+
+# Клиент Redis и кеш создаются один раз при старте приложения (main.lifespan)
+redis: Optional[Redis] = None
+cache: Optional[AsyncCache] = None
 
 
 class RedisCache(AsyncCache):
-    def __init__(self, redis_instance: Redis):
+    def __init__(self, redis_instance: Redis, serializer: CacheSerializer):
         self.redis_instance = redis_instance
+        self.serializer = serializer
 
     async def get(self, key: str) -> Optional[str]:
-        value = await self.redis_instance.get(key)
-        return value.decode("utf-8") if value else None
+        return self.serializer.loads(await self.redis_instance.get(key))
+
+    async def set(self, key: str, value: str | bytes, ex: int) -> None:
+        await self.redis_instance.set(key, self.serializer.dumps(value), ex=ex)
+
+    async def get_many(self, keys: list[str]) -> list[Optional[str]]:
+        if not keys:
+            return []
+        values = await self.redis_instance.mget(keys)
+        return [self.serializer.loads(value) for value in values]
+
+    async def get_many_with_ttl(
+        self, keys: list[str]
+    ) -> list[tuple[Optional[str], Optional[float]]]:
+        if not keys:
+            return []
+        # Значения и их PTTL читаются за один сетевой запрос
+        async with self.redis_instance.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            for key in keys:
+                pipe.pttl(key)
+            values, *ttls = await pipe.execute()
+        # PTTL < 0: ключа нет (-2) или срок не задан (-1)
+        return [
+            (self.serializer.loads(value), ttl / 1000 if ttl >= 0 else None)
+            for value, ttl in zip(values, ttls)
+        ]
+
+    async def set_many(self, mapping: dict[str, str | bytes], ex: int) -> None:
+        if not mapping:
+            return
+        # Все ключи записываются за один сетевой запрос
+        async with self.redis_instance.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, self.serializer.dumps(value), ex=ex)
+            await pipe.execute()
+
+    async def get_range(
+        self, key: str, start: int, stop: int, desc: bool = True
+    ) -> list[str]:
+        # ZREVRANGE вместо ZRANGE ... REV, чтобы работать и с Redis 5
+        if desc:
+            members = await self.redis_instance.zrevrange(key, start, stop)
+        else:
+            members = await self.redis_instance.zrange(key, start, stop)
+        return [member.decode("utf-8") for member in members]
 
-    async def set(self, key: str, value: str, ex: int) -> None:
-        await self.redis_instance.set(key, value, ex=ex)
+    async def delete(self, keys: list[str]) -> None:
+        if keys:
+            await self.redis_instance.delete(*keys)
+
+    async def set_with_tags(
+        self, key: str, value: str | bytes, tags: list[str], ex: int
+    ) -> None:
+        # Значение и теги пишутся в одной транзакции: иначе сброс тегов между
+        # ними оставил бы в кеше страницу без тегов, которую никто не удалит.
+        # Тег - отсортированное множество ключей с временем их истечения:
+        # истёкшие ключи вычищаются при каждой записи, а не копятся в теге.
+        # Множество тега живёт не меньше любого из ключей, которые в нём записаны
+        now = time.time()
+        async with self.redis_instance.pipeline(transaction=True) as pipe:
+            pipe.set(key, self.serializer.dumps(value), ex=ex)
+            for tag in tags:
+                pipe.zadd(self._tag_key(tag), {key: now + ex})
+                pipe.zremrangebyscore(self._tag_key(tag), "-inf", now)
+                pipe.expire(self._tag_key(tag), ex)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags: list[str]) -> list[str]:
+        if not tags:
+            return []
+        # Множества тегов не удаляются: по ним остальные воркеры API
+        # сбрасывают свои L1-кеши, а истекают они вместе с отмеченными ключами
+        now = time.time()
+        async with self.redis_instance.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.zrangebyscore(self._tag_key(tag), now, "+inf")
+            members = await pipe.execute()
+        keys = list(dict.fromkeys(key for tag_keys in members for key in tag_keys))
+        if not keys:
+            return []
+        # По одному DEL на ключ: ключи страниц могут лежать в разных слотах
+        # Redis Cluster, а один DEL с ними всеми там недопустим
+        async with self.redis_instance.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.delete(key)
+            await pipe.execute()
+        return [key.decode("utf-8") for key in keys]
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tags::{tag}"
 
     async def close(self):
-        raise NotImplementedError
+        # Клиент создан из пула, поэтому закрывает и все соединения пула
+        await self.redis_instance.aclose()
 
     def generate_cache_key(self, index: str, params_to_key: dict) -> str:
         """Генерация ключа для кеширования"""
@@ -32,6 +130,91 @@ class RedisCache(AsyncCache):
         return cache_key
 
 
-def get_cache_service() -> AsyncCache:
-    redis_instance = Redis(host=settings.redis_host, port=settings.redis_port)
-    return RedisCache(redis_instance)
+# Формат хранения значений в Redis, общий для всех запросов воркера
+cache_serializer = CacheSerializer(
+    compression=settings.cache_compression,
+    compress_min_size=settings.cache_compress_min_size,
+)
+
+
+class MeteredConnectionPool(BlockingConnectionPool):
+    """Пул, который сам считает созданные и выданные соединения для метрик.
+
+    Внутренние списки соединений redis-py не являются публичным API,
+    поэтому счётчики ведутся в переопределённых методах пула.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.created_connections = 0
+        self.in_use_connections: set[int] = set()
+
+    def make_connection(self) -> AbstractConnection:
+        connection = super().make_connection()
+        self.created_connections += 1
+        return connection
+
+    async def get_connection(self, command_name, *keys, **options):
+        connection = await super().get_connection(command_name, *keys, **options)
+        self.in_use_connections.add(id(connection))
+        return connection
+
+    async def release(self, connection: AbstractConnection) -> None:
+        # Вызывается и для соединения, которое не удалось выдать
+        self.in_use_connections.discard(id(connection))
+        await super().release(connection)
+
+    def reset(self) -> None:
+        super().reset()
+        self.created_connections = 0
+        self.in_use_connections.clear()
+
+
+def create_redis() -> Redis:
+    """Клиент Redis с общим для воркера ограниченным пулом соединений.
+
+    Когда все соединения заняты, запрос ждёт освобождения соединения до
+    REDIS_POOL_TIMEOUT секунд, а не открывает новое. Ответы разбирает
+    hiredis, если он установлен.
+    """
+    pool = MeteredConnectionPool(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+    )
+    redis_pool_max_connections.set(settings.redis_max_connections)
+    redis_pool_connections.labels(state="in_use").set_function(
+        lambda: len(pool.in_use_connections)
+    )
+    redis_pool_connections.labels(state="idle").set_function(
+        lambda: pool.created_connections - len(pool.in_use_connections)
+    )
+    return Redis.from_pool(pool)
+
+
+def create_stream_redis() -> Redis:
+    """Клиент Redis с собственным соединением для блокирующего XREAD.
+
+    Блокирующее чтение не занимает соединение общего пула, а таймаут
+    сокета отключён: иначе при REDIS_SOCKET_TIMEOUT меньше времени
+    ожидания XREAD чтение обрывалось бы по таймауту.
+    """
+    return Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        socket_timeout=None,
+        single_connection_client=True,
+    )
+
+
+def create_cache_service(redis_instance: Redis) -> AsyncCache:
+    redis_cache = RedisCache(redis_instance, serializer=cache_serializer)
+    if not settings.cache_l1_enabled:
+        return redis_cache
+    return TwoTierCache(l1=l1_cache, l2=redis_cache, l1_ttl=settings.cache_l1_ttl)
+
+
+async def get_cache_service() -> AsyncCache | None:
+    return cache
@@ -0,0 +1,103 @@
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Формат записи в Redis:
+#   MAGIC | версия конверта | формат тела | сжатие | тело
+# Записи без MAGIC - данные старого формата (JSON-строка как есть).
+# Тело всегда JSON-текст: сервисы разбирают его pydantic'ом напрямую, а
+# перекодирование из другого формата только добавляло бы работы.
+MAGIC = b"\xa7C"
+ENVELOPE_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+FORMAT_JSON = 0
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZSTD = 1
+COMPRESSION_LZ4 = 2
+
+COMPRESSIONS = {
+    "none": COMPRESSION_NONE,
+    "zstd": COMPRESSION_ZSTD,
+    "lz4": COMPRESSION_LZ4,
+}
+
+
+def _zstd_codec() -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=3)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+def _lz4_codec() -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    import lz4.frame
+
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+_COMPRESSION_CODECS = {COMPRESSION_ZSTD: _zstd_codec, COMPRESSION_LZ4: _lz4_codec}
+
+
+class CacheSerializer:
+    """Кодирование строковых значений кеша в байты для Redis.
+
+    Сервисы кладут в кеш JSON-строки (в том числе с заголовком
+    stale-while-revalidate), сериализатор упаковывает их в версионированный
+    конверт. Сжатие записывается в каждую запись, поэтому после смены
+    настроек старые записи продолжают читаться, а новые пишутся уже по-новому.
+    """
+
+    def __init__(self, compression: str = "none", compress_min_size: int = 1024):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        self.compression = COMPRESSIONS[compression]
+        self.compress_min_size = compress_min_size
+        self._codecs: dict[int, tuple[Callable, Callable]] = {}
+        # Библиотека выбранного сжатия должна быть установлена уже при
+        # старте, а не при первой записи в кеш
+        if self.compression != COMPRESSION_NONE:
+            self._codec(self.compression)
+
+    def _codec(self, compression: int) -> tuple[Callable, Callable]:
+        if compression not in self._codecs:
+            self._codecs[compression] = _COMPRESSION_CODECS[compression]()
+        return self._codecs[compression]
+
+    def dumps(self, value: str | bytes) -> bytes:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+
+        body, compression = value, COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(body) >= self.compress_min_size:
+            compression = self.compression
+            body = self._codec(compression)[0](body)
+
+        return MAGIC + bytes((ENVELOPE_VERSION, FORMAT_JSON, compression)) + body
+
+    def loads(self, raw: Optional[bytes]) -> Optional[str]:
+        if not raw:
+            return None
+        try:
+            if not raw.startswith(MAGIC):
+                return raw.decode("utf-8")
+
+            version, fmt, compression = raw[len(MAGIC) : HEADER_SIZE]
+            if version != ENVELOPE_VERSION:
+                # Запись более новой версии: считаем промахом, её перезапишут
+                logger.warning("Unsupported cache envelope version %s", version)
+                return None
+            if fmt != FORMAT_JSON or compression not in COMPRESSIONS.values():
+                logger.warning("Unsupported cache entry format %s/%s", fmt, compression)
+                return None
+            body = raw[HEADER_SIZE:]
+            if compression != COMPRESSION_NONE:
+                body = self._codec(compression)[1](body)
+            return body.decode("utf-8")
+        except Exception as e:
+            # Повреждённая или обрезанная запись - промах, её перезапишут
+            logger.warning("Failed to decode cache entry: %s", e)
+            return None
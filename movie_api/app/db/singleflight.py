@@ -0,0 +1,34 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from core.metrics import singleflight_coalesced_waiters_total
+
+
+class SingleFlight:
+    """Объединение одновременных запросов с одинаковым ключом.
+
+    Первый запрос запускает загрузку, остальные дожидаются её результата
+    вместо того, чтобы повторно обращаться к Elasticsearch.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            # Загрузка выполняется в отдельной задаче, чтобы отмена запроса,
+            # который её начал, не отменяла её для остальных ожидающих
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            singleflight_coalesced_waiters_total.inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+
+singleflight = SingleFlight()
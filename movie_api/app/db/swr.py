@@ -0,0 +1,62 @@
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# Формат записи в кеше: "<мягкий срок годности>|<время вычисления>|<данные>"
+HEADER_SEPARATOR = "|"
+
+
+@dataclass
+class CachedValue:
+    """Значение из кеша вместе с метаданными для stale-while-revalidate."""
+
+    data: Any
+    # Сколько секунд заняло вычисление значения
+    delta: float
+    # Unix-время, после которого значение считается устаревшим
+    expiry: float
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expiry
+
+    def needs_refresh(self, beta: float, now: Optional[float] = None) -> bool:
+        """Нужно ли обновить значение (XFetch: вероятностное раннее обновление).
+
+        Чем дольше вычисляется значение и чем ближе срок годности, тем выше
+        вероятность, что обновление начнётся до его истечения. beta=0
+        отключает раннее обновление.
+        """
+        now = now or time.time()
+        if beta <= 0:
+            return self.is_stale(now)
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.expiry
+
+
+def pack(payload: str | bytes, delta: float, ttl: int) -> str:
+    """Упаковать данные в запись кеша с мягким сроком годности ttl."""
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    expiry = time.time() + ttl
+    return f"{expiry:.3f}{HEADER_SEPARATOR}{delta:.4f}{HEADER_SEPARATOR}{payload}"
+
+
+class SWRLoader:
+    """Десериализатор записей кеша, сохранённых через pack.
+
+    Экземпляры создаются на уровне модуля, чтобы L1-кеш мог переиспользовать
+    уже разобранные значения (см. AsyncCache.get_model).
+    """
+
+    def __init__(self, validate_json: Callable[[str], Any]):
+        self.validate_json = validate_json
+
+    def __call__(self, raw: str) -> CachedValue:
+        parts = raw.split(HEADER_SEPARATOR, 2)
+        try:
+            expiry, delta, payload = float(parts[0]), float(parts[1]), parts[2]
+        except (IndexError, ValueError):
+            # Запись старого формата без заголовка: отдаём её как устаревшую
+            return CachedValue(data=self.validate_json(raw), delta=0.0, expiry=0.0)
+        return CachedValue(data=self.validate_json(payload), delta=delta, expiry=expiry)
@@ -1,30 +1,51 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
-from api.v1 import films, genres, persons
+from api.v1 import films, genres, persons, suggest
 from core.config import settings
-from core.metrics import instrument_film, instrument_person
+from core.metrics import MetricsMiddleware
 from core.tracer import configure_tracer
-from db import elastic
-from db.redis import get_cache_service
-from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI, Request, status
+from db import elastic, redis
+from fastapi import FastAPI, Request, Response, status
 from fastapi.responses import ORJSONResponse
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from services import film, genre, person, suggestion
+from services.cache_invalidation import CacheInvalidationListener
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis = get_cache_service()
-    elastic.es = AsyncElasticsearch(
-        hosts=[
-            f"{settings.elastic_schema}{settings.elastic_host}:{settings.elastic_port}"
-        ]
-    )
+    redis.redis = redis.create_redis()
+    redis.cache = redis.create_cache_service(redis.redis)
+    elastic.es = elastic.create_search_engine()
+    # Сервисы без состояния запроса: один экземпляр на воркер
+    dependencies = {"cache": redis.cache, "search_engine": elastic.es}
+    film.film_service = film.FilmService(**dependencies)
+    film.multiple_films_service = film.MultipleFilmsService(**dependencies)
+    genre.genre_service = genre.GenreService(**dependencies)
+    person.person_service = person.PersonService(**dependencies)
+    suggestion.suggest_service = suggestion.SuggestService(**dependencies)
+
+    invalidation = stream_redis = None
+    if settings.cache_invalidation_enabled:
+        # Сброс кеша по сообщениям ETL об изменённых данных
+        stream_redis = redis.create_stream_redis()
+        listener = CacheInvalidationListener(
+            redis=stream_redis,
+            cache=redis.cache,
+            stream=settings.cache_invalidation_stream,
+        )
+        invalidation = asyncio.create_task(listener.run())
 
     yield
+    if invalidation is not None:
+        invalidation.cancel()
+        with suppress(asyncio.CancelledError):
+            await invalidation
+        await stream_redis.aclose()
     # Закрытие клиентов
-    await redis.close()
+    await redis.cache.close()
     await elastic.es.close()
 
 
@@ -58,14 +79,18 @@ if settings.enable_tracing:
     configure_tracer()
     # FastAPIInstrumentor.instrument_app(app)
 
-instrumentator = Instrumentator()
-instrumentator.add(instrument_person())
-instrumentator.add(instrument_film())
-instrumentator.instrument(app).expose(app)
+app.add_middleware(MetricsMiddleware, sample_rate=settings.metrics_sample_rate)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 
 app.include_router(films.router, prefix="/api/v1/films", tags=["films"])
 app.include_router(persons.router, prefix="/api/v1/persons", tags=["persons"])
 app.include_router(genres.router, prefix="/api/v1/genres", tags=["genres"])
+app.include_router(suggest.router, prefix="/api/v1/suggest", tags=["suggest"])
 
 
 # Эндпойнт для проверки состояния приложения
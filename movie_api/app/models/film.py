@@ -10,7 +10,8 @@ class Film(BaseModel):
 
     uuid: str
     title: str
-    imdb_rating: float
+    # У фильма может не быть рейтинга
+    imdb_rating: Optional[float] = None
 
 
 class FilmDetailed(Film):
@@ -25,3 +26,23 @@ class FilmDetailed(Film):
     directors: Optional[List[Person]] = None
     actors: Optional[List[Person]] = None
     writers: Optional[List[Person]] = None
+
+
+class FilmProjection(Film):
+    """Элемент списка фильмов с дополнительными полями, запрошенными через fields."""
+
+    genre: Optional[List[Genre]] = None
+    file: Optional[str] = None
+    description: Optional[str] = None
+    directors_names: Optional[List[str]] = None
+    actors_names: Optional[List[str]] = None
+    writers_names: Optional[List[str]] = None
+    directors: Optional[List[Person]] = None
+    actors: Optional[List[Person]] = None
+    writers: Optional[List[Person]] = None
+
+
+class FilmBatchRequest(BaseModel):
+    """Схема запроса нескольких фильмов по id."""
+
+    uuids: List[str]
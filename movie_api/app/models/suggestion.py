@@ -0,0 +1,11 @@
+from typing import List
+
+from models.person import Film, Person
+from pydantic import BaseModel
+
+
+class Suggestions(BaseModel):
+    """Подсказки при наборе: фильмы по началу названия и персоны по началу имени."""
+
+    films: List[Film]
+    persons: List[Person]
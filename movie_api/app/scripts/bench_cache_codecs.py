@@ -0,0 +1,86 @@
+"""Размер записи в Redis и время её декодирования для разных видов сжатия.
+
+Значения строятся так же, как их кладут в кеш сервисы: подробности фильма с
+полным составом и страница списка фильмов с заголовком stale-while-revalidate.
+Запуск (из каталога movie_api/app):
+    python scripts/bench_cache_codecs.py --actors 200 --repeat 2000
+"""
+
+import argparse
+import time
+import uuid
+
+from db.serializer import COMPRESSIONS, CacheSerializer
+from db.swr import pack
+from models.film import Film, FilmDetailed
+from services.film import FILM_ADAPTER, FILMS_PAGE_LOADER
+
+
+def make_person(number: int) -> dict:
+    return {"uuid": str(uuid.uuid4()), "full_name": f"Person Number {number}"}
+
+
+def make_film_detailed(actors: int) -> FilmDetailed:
+    cast = [make_person(number) for number in range(actors)]
+    return FilmDetailed(
+        uuid=str(uuid.uuid4()),
+        title="The Star: A Long Title Of A Film",
+        imdb_rating=7.3,
+        genre=[{"uuid": str(uuid.uuid4()), "name": "Action"}],
+        description="A long description of the film. " * 20,
+        actors=cast,
+        actors_names=[person["full_name"] for person in cast],
+        directors=cast[:2],
+        directors_names=[person["full_name"] for person in cast[:2]],
+        writers=cast[:5],
+        writers_names=[person["full_name"] for person in cast[:5]],
+    )
+
+
+def make_films_page(size: int) -> str:
+    films = [
+        Film(uuid=str(uuid.uuid4()), title=f"Film {number}", imdb_rating=5.5)
+        for number in range(size)
+    ]
+    return pack(FILM_ADAPTER.dump_json(films), delta=0.05, ttl=3600)
+
+
+def measure(serializer: CacheSerializer, value: str, parse, repeat: int):
+    raw = serializer.dumps(value)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse(serializer.loads(raw))
+    return len(raw), (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def main(actors: int, page_size: int, repeat: int, min_size: int):
+    samples = {
+        "film_detailed": (
+            make_film_detailed(actors).model_dump_json(),
+            FilmDetailed.model_validate_json,
+        ),
+        "films_page": (make_films_page(page_size), FILMS_PAGE_LOADER),
+    }
+
+    print(f"{'value':<14} {'compression':<11} {'bytes':>8} {'decode, us':>11}")
+    for name, (value, parse) in samples.items():
+        for compression in COMPRESSIONS:
+            try:
+                serializer = CacheSerializer(compression, min_size)
+            except ImportError as e:
+                print(f"{name:<14} {compression:<11} skipped: {e}")
+                continue
+            size, decode_us = measure(serializer, value, parse, repeat)
+            print(f"{name:<14} {compression:<11} {size:>8} {decode_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--actors", type=int, default=200, help="Актёров в фильме")
+    parser.add_argument("--page-size", type=int, default=50, help="Фильмов на странице")
+    parser.add_argument(
+        "--repeat", type=int, default=2000, help="Повторов декодирования"
+    )
+    parser.add_argument("--min-size", type=int, default=1024, help="Порог сжатия, байт")
+    args = parser.parse_args()
+    main(args.actors, args.page_size, args.repeat, args.min_size)
@@ -0,0 +1,66 @@
+"""Объём ответа ES и задержка страницы списка фильмов с фильтром _source и без него.
+
+Запросы отправляются напрямую в ES, чтобы измерить именно байты по сети.
+Запуск (из каталога movie_api/app, ES с загруженным индексом movies):
+    python scripts/bench_film_source_filter.py --repeat 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiohttp
+from core.config import settings
+from services.film import MultipleFilmsService
+
+PAGE_SIZES = (10, 50, 100)
+
+
+async def measure(
+    session: aiohttp.ClientSession, url: str, body: dict, repeat: int
+) -> tuple[int, float, float]:
+    durations, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        async with session.post(url, json=body) as response:
+            payload = await response.read()
+        durations.append((time.perf_counter() - started) * 1000)
+        size = len(payload)
+    durations.sort()
+    p50 = durations[len(durations) // 2]
+    p99 = durations[max(0, int(len(durations) * 0.99) - 1)]
+    return size, p50, p99
+
+
+async def main(repeat: int):
+    url = (
+        f"{settings.elastic_schema}{settings.elastic_host}:{settings.elastic_port}"
+        "/movies/_search"
+    )
+    print(
+        f"{'page_size':>9} {'_source':>10} {'bytes':>9} {'p50, ms':>8} {'p99, ms':>8}"
+    )
+    async with aiohttp.ClientSession() as session:
+        for page_size in PAGE_SIZES:
+            query = {
+                "query": {"match_all": {}},
+                "sort": [{"imdb_rating": {"order": "desc"}}],
+                "size": page_size,
+            }
+            variants = {
+                "full": query,
+                "filtered": {
+                    **query,
+                    "_source": MultipleFilmsService._source_filter(),
+                },
+            }
+            for name, body in variants.items():
+                size, p50, p99 = await measure(session, url, body, repeat)
+                print(f"{page_size:>9} {name:>10} {size:>9} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200, help="Повторов на вариант")
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
@@ -0,0 +1,74 @@
+"""Накладные расходы MetricsMiddleware на один запрос.
+
+Приложение FastAPI с одним маршрутом вызывается напрямую как ASGI-приложение
+(без сети и HTTP-клиента): без middleware, с замером каждого запроса и
+с выборочным замером задержки. Разница времени запроса - цена метрик.
+Запуск (из каталога movie_api/app):
+    python scripts/bench_metrics_middleware.py --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+from core.metrics import MetricsMiddleware
+from fastapi import FastAPI
+
+VARIANTS = {"no middleware": None, "sample 1.0": 1.0, "sample 0.1": 0.1}
+
+
+def create_app(sample_rate) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/films/{film_uuid}")
+    async def film(film_uuid: str):
+        return {"uuid": film_uuid}
+
+    if sample_rate is not None:
+        app.add_middleware(MetricsMiddleware, sample_rate=sample_rate)
+    return app
+
+
+async def measure(app, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/films/123",
+        "raw_path": b"/api/v1/films/123",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def main(requests: int):
+    print(f"{'variant':<14} {'us/request':>10} {'overhead, us':>12}")
+    baseline = None
+    for name, sample_rate in VARIANTS.items():
+        app = create_app(sample_rate)
+        await measure(app, 1000)
+        duration = await measure(app, requests)
+        baseline = duration if baseline is None else baseline
+        print(f"{name:<14} {duration:>10.1f} {duration - baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000, help="Запросов")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
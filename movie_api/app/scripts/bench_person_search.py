@@ -0,0 +1,66 @@
+"""Сравнение задержки страницы поиска персон: последовательные запросы и msearch.
+
+Запуск (из каталога movie_api/app, ES с загруженными индексами movies и persons):
+    python scripts/bench_person_search.py --query John --repeat 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from db.elastic import create_search_engine
+from services.person import PersonService
+
+PAGE_SIZES = (1, 10, 25, 50, 99)
+
+
+async def measure(fn, repeat: int) -> tuple[float, float]:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    p95 = durations[max(0, int(len(durations) * 0.95) - 1)]
+    return statistics.median(durations), p95
+
+
+async def main(query: str, repeat: int):
+    es = create_search_engine()
+    service = PersonService(search_engine=es, cache=None)
+
+    print(
+        f"{'page_size':>9} {'persons':>7} {'before p50/p95, ms':>20} {'after p50/p95, ms':>19}"
+    )
+    for page_size in PAGE_SIZES:
+        persons = await es.search(
+            index="persons",
+            body={"query": {"match": {"full_name": query}}, "size": page_size},
+        )
+        person_ids = [hit["_source"]["uuid"] for hit in persons["hits"]["hits"]]
+
+        async def sequential():
+            # Поведение до оптимизации: один поиск фильмов на каждую персону
+            for person_id in person_ids:
+                await service._get_uuid_roles_in_films(person_id=person_id)
+
+        async def batched():
+            await service._get_uuid_roles_in_films_for_persons(person_ids)
+
+        before = await measure(sequential, repeat)
+        after = await measure(batched, repeat)
+        print(
+            f"{page_size:>9} {len(person_ids):>7} "
+            f"{before[0]:>10.1f}/{before[1]:<9.1f} {after[0]:>9.1f}/{after[1]:<9.1f}"
+        )
+
+    await es.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--query", default="John", help="Строка поиска персон")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на размер")
+    args = parser.parse_args()
+    asyncio.run(main(args.query, args.repeat))
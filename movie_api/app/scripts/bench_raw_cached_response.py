@@ -0,0 +1,97 @@
+"""Запросов в секунду на воркер для GET /films/{uuid} при попадании в кеш.
+
+Сравниваются два пути в одном процессе: прежний (разбор записи кеша в
+FilmDetailed и сериализация ответа FastAPI) и текущий (JSON из кеша
+отдаётся как есть). Redis заменён словарём в памяти, чтобы измерялась
+только работа воркера; с --l1 перед ним стоит L1-кеш, как в API.
+Запуск (из каталога movie_api/app):
+    python scripts/bench_raw_cached_response.py --actors 50 --duration 5
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+from bench_cache_codecs import make_film_detailed
+from core.http_cache import cached_json_response
+from db.interfaces import AsyncCache
+from db.memory import LRUCache, TwoTierCache
+from db.redis import RedisCache
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from models.film import FilmDetailed
+from services.film import FilmService
+
+
+class MemoryCache(AsyncCache):
+    def __init__(self):
+        self.values: dict[str, str] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.values.get(key)
+
+    async def set(self, key: str, value: str, ex: int) -> None:
+        self.values[key] = value
+
+    def generate_cache_key(self, index: str, params_to_key: dict) -> str:
+        return RedisCache.generate_cache_key(self, index, params_to_key)
+
+    async def close(self):
+        pass
+
+
+def create_app(service: FilmService) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/model/{film_uuid}", response_model=FilmDetailed)
+    async def film_model(film_uuid: str) -> FilmDetailed:
+        return await service.get_by_uuid(film_uuid)
+
+    @app.get("/raw/{film_uuid}", response_model=FilmDetailed)
+    async def film_raw(request: Request, film_uuid: str):
+        film = await service.get_json_by_uuid(film_uuid)
+        return cached_json_response(request, film, max_age=60, private=True)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, url: str, duration: float) -> float:
+    requests, started = 0, time.perf_counter()
+    while time.perf_counter() - started < duration:
+        response = await client.get(url)
+        assert response.status_code == 200, response.text
+        requests += 1
+    return requests / (time.perf_counter() - started)
+
+
+async def main(actors: int, duration: float, l1: bool):
+    cache = MemoryCache()
+    if l1:
+        cache = TwoTierCache(
+            l1=LRUCache(max_items=1000, max_bytes=64 * 1024 * 1024),
+            l2=cache,
+            l1_ttl=3600,
+        )
+    service = FilmService(search_engine=None, cache=cache)
+    film = make_film_detailed(actors)
+    await service._put_film_to_cache(film)
+
+    transport = httpx.ASGITransport(app=create_app(service))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        print(f"{'path':<6} {'req/s':>8}")
+        for path in ("model", "raw"):
+            # Прогрев: первый запрос кладёт разобранный объект в L1
+            await measure(c, f"/{path}/{film.uuid}", 0.2)
+            rps = await measure(c, f"/{path}/{film.uuid}", duration)
+            print(f"{path:<6} {rps:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--actors", type=int, default=50, help="Актёров в фильме")
+    parser.add_argument("--duration", type=float, default=5, help="Секунд на путь")
+    parser.add_argument("--l1", action="store_true", help="L1-кеш перед Redis")
+    args = parser.parse_args()
+    asyncio.run(main(args.actors, args.duration, args.l1))
@@ -0,0 +1,59 @@
+"""Задержка подсказок /api/v1/suggest для коротких префиксов.
+
+Для каждого префикса длиной от 1 до 3 символов делается серия запросов;
+первый запрос прогревает in-process кеш префиксов воркера.
+Запуск (из каталога movie_api/app, API и ES запущены):
+    python scripts/bench_suggest.py --url http://localhost:8000 --repeat 200
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import aiohttp
+
+# Префиксы длиной 1-3 символа, как при наборе первых букв запроса
+PREFIXES = {
+    1: ["a", "j", "m", "s", "t"],
+    2: ["jo", "ma", "sm", "st", "th"],
+    3: ["joh", "mas", "sma", "sta", "the"],
+}
+
+
+async def measure(
+    session: aiohttp.ClientSession, url: str, prefixes: list[str], repeat: int
+) -> tuple[float, float]:
+    durations = []
+    for _ in range(repeat):
+        for prefix in prefixes:
+            started = time.perf_counter()
+            async with session.get(
+                url,
+                params={"prefix": prefix},
+                headers={"X-Request-Id": str(uuid.uuid4())},
+            ) as response:
+                await response.read()
+            durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    p50 = durations[len(durations) // 2]
+    p99 = durations[max(0, int(len(durations) * 0.99) - 1)]
+    return p50, p99
+
+
+async def main(base_url: str, repeat: int):
+    url = f"{base_url}/api/v1/suggest"
+    print(f"{'prefix len':>10} {'p50, ms':>8} {'p99, ms':>8}")
+    async with aiohttp.ClientSession() as session:
+        for length, prefixes in PREFIXES.items():
+            await measure(session, url, prefixes, 1)
+            p50, p99 = await measure(session, url, prefixes, repeat)
+            print(f"{length:>10} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000", help="Адрес API")
+    parser.add_argument("--repeat", type=int, default=200, help="Повторов на префикс")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.repeat))
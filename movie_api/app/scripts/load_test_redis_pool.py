@@ -0,0 +1,90 @@
+"""Нагрузочный тест: число соединений с Redis при постоянном потоке запросов к API.
+
+Запросы отправляются с заданной частотой независимо от времени ответа.
+Каждую секунду печатаются задержки ответов, число клиентов Redis
+(`INFO clients`) и занятость пулов воркеров из /metrics.
+Запуск (из каталога movie_api/app, API и Redis запущены):
+    python scripts/load_test_redis_pool.py --url http://localhost:8000 --rps 1000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import aiohttp
+from core.config import settings
+from redis.asyncio import Redis
+
+DEFAULT_PATH = "/api/v1/genres?query=a&page_size=10"
+
+
+async def send(session: aiohttp.ClientSession, url: str, stats: dict) -> None:
+    started = time.perf_counter()
+    try:
+        async with session.get(url, headers={"X-Request-Id": str(uuid.uuid4())}) as r:
+            await r.read()
+            ok = r.status < 500
+    except aiohttp.ClientError:
+        ok = False
+    stats["latencies"].append((time.perf_counter() - started) * 1000)
+    stats["ok" if ok else "errors"] += 1
+
+
+async def pool_metrics(session: aiohttp.ClientSession, base_url: str) -> str:
+    # При нескольких воркерах /metrics отдаёт значения одного из них
+    async with session.get(f"{base_url}/metrics") as response:
+        text = await response.text()
+    values = {
+        line.split("{")[1].split("}")[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith("redis_pool_connections{")
+    }
+    return "/".join(
+        str(int(values.get(f'state="{state}"', 0))) for state in ("in_use", "idle")
+    )
+
+
+async def main(base_url: str, path: str, rps: int, duration: int):
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        print(
+            f"{'sec':>3} {'sent':>6} {'ok':>6} {'err':>5} {'p50, ms':>8} "
+            f"{'p99, ms':>8} {'redis clients':>13} {'pool in_use/idle':>16}"
+        )
+        tasks = set()
+        for second in range(1, duration + 1):
+            stats = {"ok": 0, "errors": 0, "latencies": []}
+            started = time.perf_counter()
+            for number in range(rps):
+                # Равномерно распределяем запросы внутри секунды
+                delay = started + number / rps - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(send(session, base_url + path, stats))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(max(0.0, started + 1 - time.perf_counter()))
+
+            clients = (await redis.info("clients"))["connected_clients"]
+            latencies = sorted(stats["latencies"]) or [0.0]
+            p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+            print(
+                f"{second:>3} {rps:>6} {stats['ok']:>6} {stats['errors']:>5} "
+                f"{statistics.median(latencies):>8.1f} {p99:>8.1f} {clients:>13} "
+                f"{await pool_metrics(session, base_url):>16}"
+            )
+        await asyncio.gather(*tasks)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000", help="Адрес API")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="Запрашиваемый путь")
+    parser.add_argument("--rps", type=int, default=1000, help="Запросов в секунду")
+    parser.add_argument("--duration", type=int, default=30, help="Длительность, сек")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.path, args.rps, args.duration))
@@ -1,9 +1,165 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
 from abc import ABC
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Optional
 
+from core.config import settings
 from db.interfaces import AsyncCache, AsyncSearchEngine
+from db.singleflight import singleflight
+from db.swr import CachedValue, pack
+from elasticsearch import NotFoundError
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+from services.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Ссылки на фоновые обновления кеша, чтобы задачи не собрал сборщик мусора
+_background_refreshes: set[asyncio.Task] = set()
+
+
+def entity_tag(entity: str, entity_id: str) -> str:
+    """Тег, которым отмечаются ключи кеша, содержащие фильм, жанр или персону."""
+    return f"{entity}::{entity_id}"
+
+
+def schema_version(model: Any) -> str:
+    """Короткий хеш JSON-схемы модели для ключей кеша.
+
+    Ответы по id отдаются из кеша без валидации, поэтому запись должна
+    соответствовать текущей модели: при изменении схемы меняется ключ,
+    и записи старого формата просто перестают читаться.
+    """
+    schema = json.dumps(TypeAdapter(model).json_schema(), sort_keys=True)
+    return hashlib.blake2b(schema.encode("utf-8"), digest_size=4).hexdigest()
 
 
 class BaseService(ABC):
     def __init__(self, search_engine: AsyncSearchEngine, cache: AsyncCache):
         self.search_engine = search_engine
         self.cache = cache
+
+    def cache_keys(self, entity_id: str) -> list[str]:
+        """Ключи кеша, которые нужно сбросить при изменении сущности в ETL."""
+        return []
+
+    async def _get_or_compute(
+        self,
+        cache_key: str,
+        get_cached: Callable[[], Awaitable[Optional[CachedValue]]],
+        compute: Callable[[], Awaitable[Any]],
+        put: Callable[[Any, float], Awaitable[None]],
+    ) -> Any:
+        """Получить значение из кеша по схеме stale-while-revalidate.
+
+        Устаревшее значение отдаётся сразу, а обновление запускается в фоне.
+        При полном промахе одновременные запросы ждут одно общее вычисление.
+        """
+        cached = await get_cached()
+        if cached is not None:
+            if cached.needs_refresh(settings.cache_xfetch_beta):
+                self._refresh_in_background(cache_key, compute, put)
+            return cached.data
+
+        return await singleflight.do(
+            cache_key, lambda: self._compute_and_put(compute, put)
+        )
+
+    @staticmethod
+    async def _compute_and_put(
+        compute: Callable[[], Awaitable[Any]],
+        put: Callable[[Any, float], Awaitable[None]],
+    ) -> Any:
+        started = time.monotonic()
+        data = await compute()
+        await put(data, time.monotonic() - started)
+        return data
+
+    def _refresh_in_background(
+        self,
+        cache_key: str,
+        compute: Callable[[], Awaitable[Any]],
+        put: Callable[[Any, float], Awaitable[None]],
+    ) -> None:
+        async def refresh():
+            try:
+                await singleflight.do(
+                    cache_key, lambda: self._compute_and_put(compute, put)
+                )
+            except Exception as e:
+                logger.warning("Background refresh of %s failed: %s", cache_key, e)
+
+        task = asyncio.create_task(refresh())
+        _background_refreshes.add(task)
+        task.add_done_callback(_background_refreshes.discard)
+
+    async def _put_page(
+        self,
+        cache_key: str,
+        payload: str | bytes,
+        delta: float,
+        ttl: int,
+        tags: list[str],
+    ) -> None:
+        """Сохранить страницу списка и отметить её тегами входящих в неё сущностей.
+
+        Страница удаляется из кеша, как только ETL сообщит об изменении любой
+        из этих сущностей, поэтому TTL здесь может быть долгим.
+        """
+        await self.cache.set_with_tags(
+            cache_key, pack(payload, delta, ttl=ttl), tags, ex=self._hard_ttl(ttl)
+        )
+
+    @staticmethod
+    def _hard_ttl(ttl: int) -> int:
+        """Срок хранения записи: мягкий TTL плюс окно отдачи устаревших данных."""
+        return ttl + settings.cache_stale_time_life
+
+    async def _search_by_cursor(
+        self, index: str, body: dict, cursor: str, page_size: int
+    ) -> tuple[list[dict], Optional[str]]:
+        """Постраничный поиск через point-in-time и search_after.
+
+        В отличие от from/size стоимость страницы не растёт с её номером и не
+        ограничена max_result_window. Сортировка в body обязательна: ES сам
+        добавляет к ней tiebreaker _shard_doc.
+
+        Returns:
+            найденные документы и курсор следующей страницы (None, если это
+            последняя страница)
+        """
+        pit_id, search_after = decode_cursor(cursor)
+        if not pit_id:
+            pit = await self.search_engine.open_point_in_time(
+                index=index, keep_alive=settings.es_pit_keep_alive
+            )
+            pit_id = pit["id"]
+
+        body = {
+            **body,
+            "size": page_size,
+            "pit": {"id": pit_id, "keep_alive": settings.es_pit_keep_alive},
+        }
+        if search_after:
+            body["search_after"] = search_after
+        try:
+            response = await self.search_engine.search(body=body)
+        except NotFoundError:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail="Cursor expired"
+            )
+
+        hits = response["hits"]["hits"]
+        pit_id = response.get("pit_id", pit_id)
+        if len(hits) < page_size:
+            # Выборка закончилась, point-in-time больше не нужен
+            try:
+                await self.search_engine.close_point_in_time(id=pit_id)
+            except NotFoundError:
+                pass
+            return hits, None
+        return hits, encode_cursor(pit_id, hits[-1]["sort"])
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+
+from core.metrics import cache_invalidations_total
+from db.interfaces import AsyncCache
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from services.base_service import BaseService, entity_tag
+from services.film import FilmService
+from services.genre import GenreService
+from services.person import PersonService
+
+logger = logging.getLogger(__name__)
+
+# Сколько миллисекунд ждать новых сообщений в одном запросе XREAD
+READ_BLOCK_MS = 5000
+READ_COUNT = 100
+# Сущности, у которых нет своих ключей кеша: по ним сбрасываются только
+# страницы, отмеченные их тегами (рейтинги: "all" или id жанра)
+TAG_ONLY_ENTITIES = {"ranking"}
+
+
+class CacheInvalidationListener:
+    """Сброс кеша по сообщениям ETL об изменённых фильмах, жанрах и персонах.
+
+    ETL пишет в Redis stream сообщения вида {"entity": "film", "ids": "[...]"},
+    а при изменении рейтингов - {"entity": "ranking", "ids": "[...]"}.
+    Каждый воркер API читает поток сам (без consumer group), так как помимо
+    ключей в Redis он должен очистить и собственный L1-кеш.
+    """
+
+    def __init__(self, redis: Redis, cache: AsyncCache, stream: str):
+        self.redis = redis
+        self.cache = cache
+        self.stream = stream
+        self.services: dict[str, BaseService] = {
+            "film": FilmService(search_engine=None, cache=cache),
+            "genre": GenreService(search_engine=None, cache=cache),
+            "person": PersonService(search_engine=None, cache=cache),
+        }
+
+    async def run(self) -> None:
+        # Читаем только новые сообщения: L1 после старта воркера пуст
+        last_id = "$"
+        while True:
+            try:
+                response = await self.redis.xread(
+                    {self.stream: last_id}, count=READ_COUNT, block=READ_BLOCK_MS
+                )
+                for _, messages in response:
+                    for message_id, fields in messages:
+                        await self.handle(fields)
+                        last_id = message_id
+            except RedisError as e:
+                # Необработанные сообщения будут прочитаны повторно
+                logger.warning("Cache invalidation stream read failed: %s", e)
+                await asyncio.sleep(1)
+            except Exception as e:
+                # Любая другая ошибка не должна останавливать сброс кеша в воркере
+                logger.exception("Cache invalidation failed: %s", e)
+                await asyncio.sleep(1)
+
+    async def handle(self, fields: dict[bytes, bytes]) -> None:
+        try:
+            await self._handle(fields)
+        except RedisError:
+            raise
+        except Exception as e:
+            # Сообщение, которое не удаётся обработать, пропускается, иначе
+            # воркер перечитывал бы его бесконечно
+            logger.exception("Failed to handle cache invalidation %s: %s", fields, e)
+
+    async def _handle(self, fields: dict[bytes, bytes]) -> None:
+        try:
+            entity = fields[b"entity"].decode("utf-8")
+            entity_ids = json.loads(fields[b"ids"])
+        except (KeyError, ValueError) as e:
+            logger.warning("Malformed cache invalidation message %s: %s", fields, e)
+            return
+        service = self.services.get(entity)
+        if service is None and entity not in TAG_ONLY_ENTITIES:
+            logger.warning("Unknown entity in cache invalidation message: %s", entity)
+            return
+        if service is not None:
+            await self.cache.delete(
+                [
+                    key
+                    for entity_id in entity_ids
+                    for key in service.cache_keys(entity_id)
+                ]
+            )
+        await self.cache.invalidate_tags(
+            [entity_tag(entity, entity_id) for entity_id in entity_ids]
+        )
+        cache_invalidations_total.labels(entity=entity).inc(len(entity_ids))
+        logger.info("Invalidated cache for %s %s", len(entity_ids), entity)
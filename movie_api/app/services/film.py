@@ -1,22 +1,44 @@
 import logging
 from datetime import datetime
-from functools import lru_cache
 from http import HTTPStatus
 from pprint import pformat
-from typing import Optional
+from typing import Any, Optional
 
 from core.config import settings
-from db.elastic import get_search_engine
 from db.interfaces import AsyncCache, AsyncSearchEngine
-from db.redis import get_cache_service
+from db.singleflight import singleflight
+from db.swr import CachedValue, SWRLoader
 from elasticsearch import NotFoundError
-from fastapi import Depends, HTTPException
-from models.film import Film, FilmDetailed
+from fastapi import HTTPException
+from models.film import Film, FilmDetailed, FilmProjection
 from models.genre import Genre
 from pydantic import TypeAdapter
-from services.base_service import BaseService
+from services.base_service import BaseService, entity_tag, schema_version
 
 FILM_ADAPTER = TypeAdapter(list[Film])
+GENRE_UUIDS_ADAPTER = TypeAdapter(list[str])
+FILM_DETAILED_SCHEMA = schema_version(FilmDetailed)
+FILMS_PAGE_LOADER = SWRLoader(FILM_ADAPTER.validate_json)
+# Страницы с дополнительными полями (fields=) хранятся как есть, словарями
+FILM_PROJECTION_ADAPTER = TypeAdapter(list[dict[str, Any]])
+FILMS_PROJECTION_PAGE_LOADER = SWRLoader(FILM_PROJECTION_ADAPTER.validate_json)
+
+# Поля документа, из которых строится элемент списка фильмов: остальная часть
+# _source (описание, полные списки участников) из ES не запрашивается
+FILM_LIST_SOURCE = list(Film.model_fields)
+# Поля, которые клиент может дополнительно запросить через fields=
+FILM_PROJECTION_FIELDS = frozenset(FilmProjection.model_fields) - set(FILM_LIST_SOURCE)
+
+# Рейтинги фильмов (uuid -> imdb_rating), которые поддерживает ETL в Redis:
+# общий и по каждому жанру. Фильмы без рейтинга в них со счётом -1.
+# Ключ готовности ставится после их первой сборки
+RANKING_ALL_KEY = "films:rating:all"
+RANKING_GENRE_KEY = "films:rating:genre:{}"
+RANKINGS_READY_KEY = "films:rating:ready"
+# Страницы, которые можно собрать из рейтингов, отмечаются тегом рейтинга:
+# ETL публикует его, когда меняется порядок или состав рейтинга
+RANKING_ENTITY = "ranking"
+RANKING_ALL = "all"
 
 
 logger = logging.getLogger(__name__)
@@ -40,24 +62,147 @@ class FilmService(BaseService):
         # Получаем данные из кеша
         film = await self._get_film_from_cache(film_uuid)
         if not film:
-            # Если фильма нет в кеше, то ищем его в Elasticsearch
-            film = await self._get_film_from_elastic(film_uuid)
-            if not film:
-                # Если он отсутствует в Elasticsearch, значит, фильма вообще нет в базе
-                return None
-            # Сохраняем фильм в кеш
-            await self._put_film_to_cache(film)
+            # Если фильма нет в кеше, то ищем его в Elasticsearch.
+            # Одновременные промахи по одному ключу ждут один общий запрос
+            cache_key = self._get_film_cache_key(film_uuid)
+            film = await singleflight.do(
+                cache_key, lambda: self._load_film_to_cache(film_uuid)
+            )
+
+        return film
+
+    async def get_json_by_uuid(self, film_uuid: str) -> Optional[str | bytes]:
+        """Получить фильм сразу в виде JSON ответа API.
 
+        Значение из кеша отдаётся как есть, без разбора в FilmDetailed
+        и повторной сериализации.
+        """
+        cache_key = self._get_film_cache_key(film_uuid)
+        payload = await self.cache.get(cache_key)
+        if payload:
+            return payload
+        film = await singleflight.do(
+            cache_key, lambda: self._load_film_to_cache(film_uuid)
+        )
+        return film.model_dump_json() if film else None
+
+    async def _load_film_to_cache(self, film_uuid: str) -> Optional[FilmDetailed]:
+        film = await self._get_film_from_elastic(film_uuid)
+        if not film:
+            # Если он отсутствует в Elasticsearch, значит, фильма вообще нет в базе
+            return None
+        # Сохраняем фильм в кеш
+        await self._put_film_to_cache(film)
         return film
 
+    # 1.3. получение нескольких фильмов по списку id
+    async def get_many_by_uuid(self, film_uuids: list[str]) -> list[FilmDetailed]:
+        """Получить детальную информацию о нескольких фильмах.
+
+        Все фильмы запрашиваются из кеша одним MGET, промахи - одним
+        ES mget, а затем записываются в кеш одним pipeline.
+
+        Parameters:
+            film_uuids: список uuid фильмов
+
+        Returns:
+            найденные фильмы в порядке запроса
+        """
+        film_uuids = list(dict.fromkeys(film_uuids))
+        cache_keys = [self._get_film_cache_key(film_uuid) for film_uuid in film_uuids]
+        cached_films = await self.cache.get_many_models(
+            cache_keys, FilmDetailed.model_validate_json
+        )
+        films = dict(zip(film_uuids, cached_films))
+
+        missed_uuids = [film_uuid for film_uuid, film in films.items() if not film]
+        if missed_uuids:
+            found_films = await self._get_films_from_elastic(missed_uuids)
+            films.update(found_films)
+            await self.cache.set_many(
+                {
+                    self._get_film_cache_key(film_uuid): film.model_dump_json()
+                    for film_uuid, film in found_films.items()
+                },
+                settings.cache_time_life,
+            )
+
+        return [films[film_uuid] for film_uuid in film_uuids if films[film_uuid]]
+
+    async def get_genre_uuids(self, film_uuid: str) -> Optional[list[str]]:
+        """Получить uuid жанров фильма.
+
+        Жанры кешируются отдельно от карточки фильма, а при промахе из ES
+        читается только genre.uuid. Если фильма нет в базе, возвращается None.
+        """
+        cache_key = self._get_film_genres_cache_key(film_uuid)
+        genre_uuids = await self.cache.get_model(
+            cache_key, GENRE_UUIDS_ADAPTER.validate_json
+        )
+        if genre_uuids is None:
+            genre_uuids = await singleflight.do(
+                cache_key, lambda: self._load_genre_uuids_to_cache(film_uuid)
+            )
+        return genre_uuids
+
+    async def _load_genre_uuids_to_cache(self, film_uuid: str) -> Optional[list[str]]:
+        # Карточка фильма в кеше уже содержит жанры
+        film = await self._get_film_from_cache(film_uuid)
+        if film:
+            genre_uuids = [genre.uuid for genre in film.genre]
+        else:
+            try:
+                doc = await self.search_engine.get(
+                    index="movies", id=film_uuid, source_includes=["genre.uuid"]
+                )
+            except NotFoundError:
+                return None
+            genre_uuids = [genre["uuid"] for genre in doc["_source"].get("genre", [])]
+        await self.cache.set(
+            self._get_film_genres_cache_key(film_uuid),
+            GENRE_UUIDS_ADAPTER.dump_json(genre_uuids),
+            settings.cache_time_life,
+        )
+        return genre_uuids
+
+    async def _get_films_from_elastic(
+        self, film_uuids: list[str]
+    ) -> dict[str, FilmDetailed]:
+        response = await self.search_engine.mget(index="movies", ids=film_uuids)
+        return {
+            doc["_id"]: self._film_from_source(doc["_source"])
+            for doc in response["docs"]
+            if doc.get("found")
+        }
+
+    def cache_keys(self, entity_id: str) -> list[str]:
+        return [
+            self._get_film_cache_key(entity_id),
+            self._get_film_genres_cache_key(entity_id),
+        ]
+
+    def _get_film_cache_key(self, film_uuid: str) -> str:
+        params_to_key = {
+            "uuid": film_uuid,
+            "schema": FILM_DETAILED_SCHEMA,
+        }
+        return self.cache.generate_cache_key("movies", params_to_key)
+
+    def _get_film_genres_cache_key(self, film_uuid: str) -> str:
+        params_to_key = {"uuid": film_uuid, "field": "genre"}
+        return self.cache.generate_cache_key("movies", params_to_key)
+
     # 2.1. получение фильма из ES по id
     async def _get_film_from_elastic(self, film_id: str) -> Optional[FilmDetailed]:
         try:
             doc = await self.search_engine.get(index="movies", id=film_id)
         except NotFoundError:
             return None
-        source = doc["_source"]
         logger.debug(pformat(doc["_source"]))
+        return self._film_from_source(doc["_source"])
+
+    @staticmethod
+    def _film_from_source(source: dict) -> FilmDetailed:
         genres = source.get("genre", [])
         genre_objs = [Genre(**genre) for genre in genres]
         film_data = {
@@ -75,28 +220,20 @@ class FilmService(BaseService):
 
     # 3.1. получение фильма из кэша по id
     async def _get_film_from_cache(self, film_uuid: str) -> Optional[FilmDetailed]:
-        params_to_key = {
-            "uuid": film_uuid,
-        }
-        cache_key = self.cache.generate_cache_key("movies", params_to_key)
+        cache_key = self._get_film_cache_key(film_uuid)
 
-        film_data = await self.cache.get(cache_key)
-        if not film_data:
+        # pydantic предоставляет удобное API для создания объекта моделей из json,
+        # а L1-кеш хранит уже десериализованный объект FilmDetailed
+        film = await self.cache.get_model(cache_key, FilmDetailed.model_validate_json)
+        if not film:
             return None
 
         logging.info("Взято из кэша по ключу: {0}".format(cache_key))
-        # pydantic предоставляет удобное API для создания объекта моделей из json
-        return FilmDetailed.model_validate_json(film_data)  # возвращаем
-
-    # десериализованный объект Film
+        return film
 
     # 4.1. сохранение фильма в кэш по id:
     async def _put_film_to_cache(self, film: Film):
-        # подготовка к генерации ключа
-        params_to_key = {
-            "uuid": film.uuid,
-        }
-        cache_key = self.cache.generate_cache_key("movies", params_to_key)
+        cache_key = self._get_film_cache_key(film.uuid)
 
         await self.cache.set(
             cache_key,
@@ -108,11 +245,11 @@ class FilmService(BaseService):
 class MultipleFilmsService(BaseService):
     """Сервис для получения информации о нескольких фильмов из elastic."""
 
-    async def get_by_uuid(self, uuid: str):
-        response = await self.search_engine.get(index="movies", id=uuid)
-        if not response["found"]:
-            return None
-        return response["_source"]
+    def __init__(self, search_engine: AsyncSearchEngine, cache: AsyncCache):
+        super().__init__(search_engine=search_engine, cache=cache)
+        # Страницы из рейтингов собираются из карточек фильмов в кеше,
+        # жанры для similar= тоже берутся из кеша фильмов
+        self.film_service = FilmService(search_engine=search_engine, cache=cache)
 
     # 1.2. получение страницы списка фильмов отсортированных по популярности
     async def get_multiple_films(
@@ -123,8 +260,13 @@ class MultipleFilmsService(BaseService):
         genre: Optional[str] = None,
         similar: Optional[str] = None,
         release_date_cutoff: Optional[datetime] = None,
-    ) -> Optional[list[Film]]:
-        """Получение нескольких фильмов"""
+        fields: Optional[list[str]] = None,
+    ) -> Optional[list[Film | dict]]:
+        """Получение нескольких фильмов.
+
+        Без fields элементы списка - Film, с fields - словари с полями Film
+        и запрошенными дополнительными полями.
+        """
         # ключ для кэша задается в формате ключ::значение::ключ::значение и т.д.
         params_to_key = {
             "desc": str(int(desc_order)),
@@ -133,29 +275,39 @@ class MultipleFilmsService(BaseService):
             "genre": genre,
             "similar": similar,
         }
+        if fields:
+            params_to_key["fields"] = ",".join(fields)
         # создаём ключ для кэша
         cache_key = self.cache.generate_cache_key("movies", params_to_key)
 
-        # запрашиваем инфо в кэше по ключу
-        films_page = await self._get_multiple_films_from_cache(cache_key)
-        if not films_page:
-            # если в кэше нет значения по этому ключу, делаем запрос в ES
-            films_page = await self._get_multiple_films_from_elastic(
+        # запрашиваем инфо в кэше по ключу; если значения нет, делаем запрос в ES,
+        # а устаревшее значение отдаём сразу и обновляем в фоне
+        films_page = await self._get_or_compute(
+            cache_key,
+            get_cached=lambda: self._get_multiple_films_from_cache(cache_key, fields),
+            compute=lambda: self._compute_multiple_films(
                 desc_order=desc_order,
                 page_size=page_size,
                 page_number=page_number,
                 genre=genre,
                 similar=similar,
                 release_date_cutoff=release_date_cutoff,
-            )
+                fields=fields,
+            ),
             # Кэшируем результат (пустой результат тоже)
-            await self._put_multiple_films_to_cache(
+            put=lambda films, delta: self._put_multiple_films_to_cache(
                 cache_key=cache_key,
-                films=films_page,
-            )
-
-            if not films_page:
-                return None
+                films=films,
+                delta=delta,
+                fields=fields,
+                similar=similar,
+                ranking=(
+                    None if similar or release_date_cutoff else genre or RANKING_ALL
+                ),
+            ),
+        )
+        if not films_page:
+            return None
 
         return films_page
 
@@ -164,7 +316,8 @@ class MultipleFilmsService(BaseService):
         query: str,
         page_number: int,
         page_size: int,
-    ) -> list[Film]:
+        fields: Optional[list[str]] = None,
+    ) -> list[Film | dict]:
         """Полнотекстовый поиск фильмов."""
         # ключ для кэша задается в формате ключ::значение::ключ::значение и т.д.
         params_to_key = {
@@ -172,23 +325,144 @@ class MultipleFilmsService(BaseService):
             "page_size": str(page_size),
             "page_number": str(page_number),
         }
+        if fields:
+            params_to_key["fields"] = ",".join(fields)
 
         # создаём ключ для кэша
         cache_key = self.cache.generate_cache_key("movies", params_to_key)
 
-        # запрашиваем инфо в кэше
-        films_page = await self._get_multiple_films_from_cache(cache_key)
-        if not films_page:
-            films_page = await self._fulltext_search_films_in_elastic(
+        # запрашиваем инфо в кэше и сохраняем поиск по фильму в кеш
+        # (даже если поиск не дал результата)
+        return await self._get_or_compute(
+            cache_key,
+            get_cached=lambda: self._get_multiple_films_from_cache(cache_key, fields),
+            compute=lambda: self._fulltext_search_films_in_elastic(
                 query=query,
                 page_number=page_number,
                 page_size=page_size,
+                fields=fields,
+            ),
+            put=lambda films, delta: self._put_multiple_films_to_cache(
+                cache_key=cache_key, films=films, delta=delta, fields=fields
+            ),
+        )
+
+    async def _compute_multiple_films(
+        self,
+        desc_order: bool,
+        page_size: int,
+        page_number: int,
+        genre: Optional[str] = None,
+        similar: Optional[str] = None,
+        release_date_cutoff: Optional[datetime] = None,
+        fields: Optional[list[str]] = None,
+    ) -> list[Film | dict]:
+        """Страница списка фильмов: из рейтингов ETL, если в запросе нет
+        фильтров, которых в них нет (similar, дата релиза), иначе из ES."""
+        if not similar and not release_date_cutoff:
+            films_page = await self._get_multiple_films_from_ranking(
+                desc_order=desc_order,
+                page_size=page_size,
+                page_number=page_number,
+                genre=genre,
+                fields=fields,
             )
+            if films_page is not None:
+                return films_page
+        return await self._get_multiple_films_from_elastic(
+            desc_order=desc_order,
+            page_size=page_size,
+            page_number=page_number,
+            genre=genre,
+            similar=similar,
+            release_date_cutoff=release_date_cutoff,
+            fields=fields,
+        )
+
+    async def _get_multiple_films_from_ranking(
+        self,
+        desc_order: bool,
+        page_size: int,
+        page_number: int,
+        genre: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+    ) -> Optional[list[Film | dict]]:
+        """Страница фильмов из рейтинга в Redis; None, если рейтинги ещё не собраны."""
+        if not await self.cache.get(RANKINGS_READY_KEY):
+            return None
+        start = (page_number - 1) * page_size
+        film_uuids = await self.cache.get_range(
+            RANKING_GENRE_KEY.format(genre) if genre else RANKING_ALL_KEY,
+            start,
+            start + page_size - 1,
+            desc=desc_order,
+        )
+        films = await self.film_service.get_many_by_uuid(film_uuids)
+        names = set(FILM_LIST_SOURCE + list(fields or []))
+        if fields:
+            return [film.model_dump(include=names) for film in films]
+        return [Film(**film.model_dump(include=names)) for film in films]
 
-        # Сохраняем поиск по фильму в кеш (даже если поиск не дал результата)
-        await self._put_multiple_films_to_cache(cache_key, films_page)
+    async def get_multiple_films_by_cursor(
+        self,
+        cursor: str,
+        desc_order: bool,
+        page_size: int,
+        genre: Optional[str] = None,
+        similar: Optional[str] = None,
+        release_date_cutoff: Optional[datetime] = None,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[Film | dict], Optional[str]]:
+        """Получение страницы фильмов по курсору (search_after + point-in-time).
 
-        return films_page
+        Страницы по курсору не кешируются: каждая из них читается один раз
+        при последовательном проходе по каталогу.
+        """
+        query = await self._build_multiple_films_query(
+            similar=similar,
+            genre=genre,
+            desc_order=desc_order,
+            release_date_cutoff=release_date_cutoff,
+        )
+        query["_source"] = self._source_filter(fields)
+        hits, next_cursor = await self._search_by_cursor(
+            index="movies", body=query, cursor=cursor, page_size=page_size
+        )
+        return self._films_from_hits(hits, fields), next_cursor
+
+    async def search_films_by_cursor(
+        self,
+        query: str,
+        cursor: str,
+        page_size: int,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[Film | dict], Optional[str]]:
+        """Полнотекстовый поиск фильмов с пагинацией по курсору."""
+        hits, next_cursor = await self._search_by_cursor(
+            index="movies",
+            body={
+                "query": {"match": {"title": query}},
+                "sort": ["_score"],
+                "_source": self._source_filter(fields),
+            },
+            cursor=cursor,
+            page_size=page_size,
+        )
+        return self._films_from_hits(hits, fields), next_cursor
+
+    @staticmethod
+    def _source_filter(fields: Optional[list[str]] = None) -> dict:
+        """Фильтр _source: только поля, нужные для элементов списка."""
+        return {"includes": FILM_LIST_SOURCE + list(fields or [])}
+
+    @staticmethod
+    def _films_from_hits(
+        hits: list[dict], fields: Optional[list[str]] = None
+    ) -> list[Film | dict]:
+        if not fields:
+            return [Film(**hit["_source"]) for hit in hits]
+        names = FILM_LIST_SOURCE + fields
+        return [{name: hit["_source"].get(name) for name in names} for hit in hits]
 
     async def _get_multiple_films_from_elastic(
         self,
@@ -198,11 +472,52 @@ class MultipleFilmsService(BaseService):
         page_size: int = 50,
         page_number: int = 1,
         release_date_cutoff: Optional[datetime] = None,
+        fields: Optional[list[str]] = None,
     ):
+        query = await self._build_multiple_films_query(
+            similar=similar,
+            genre=genre,
+            desc_order=desc_order,
+            release_date_cutoff=release_date_cutoff,
+        )
+        query["_source"] = self._source_filter(fields)
+        query["size"] = page_size
+        query["from"] = (page_number - 1) * page_size
+        logging.info(f"Query to Elasticsearch: {pformat(query)}")
+        try:
+            similar_response = await self.search_engine.search(
+                index="movies", body=query
+            )
+            logging.debug(f"Response from Elasticsearch: {pformat(similar_response)}")
+        except Exception as e:
+            logging.error(f"Error while querying Elasticsearch: {str(e)}")
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e)
+            )
+
+        if not similar_response["hits"]["hits"]:
+            return []
+
+        return self._films_from_hits(similar_response["hits"]["hits"], fields)
+
+    async def _build_multiple_films_query(
+        self,
+        similar: Optional[str] = None,
+        genre: Optional[str] = None,
+        desc_order: bool = True,
+        release_date_cutoff: Optional[datetime] = None,
+    ) -> dict:
+        """Запрос в ES для списка фильмов (без параметров пагинации)."""
         query = {
-            "size": page_size,
-            "from": (page_number - 1) * page_size,
-            "sort": [{"imdb_rating": {"order": "desc" if desc_order else "asc"}}],
+            # Фильмы без рейтинга идут как самые низкие, как и в рейтингах ETL
+            "sort": [
+                {
+                    "imdb_rating": {
+                        "order": "desc" if desc_order else "asc",
+                        "missing": "_last" if desc_order else "_first",
+                    }
+                }
+            ],
             "query": {"bool": {"must": [], "filter": []}},
         }
 
@@ -221,19 +536,19 @@ class MultipleFilmsService(BaseService):
         if similar:
             logging.info("similar: %s", similar)
 
-            similar_film = await self.get_by_uuid(similar)
-            logging.info("similar film retrieved: %s", similar_film)
-            if similar_film and similar_film.get("genre"):
-                first_genre_uuid = similar_film["genre"][0]["uuid"]
-                logging.info("first_genre_uuid: %s", first_genre_uuid)
+            genre_uuids = await self.film_service.get_genre_uuids(similar)
+            logging.info("similar film genres: %s", genre_uuids)
+            if genre_uuids:
+                # Похожие - фильмы хотя бы с одним общим жанром, кроме самого фильма
                 query["query"]["bool"]["filter"].append(
                     {
                         "nested": {
                             "path": "genre",
-                            "query": {"term": {"genre.uuid": first_genre_uuid}},
+                            "query": {"terms": {"genre.uuid": genre_uuids}},
                         }
                     }
                 )
+                query["query"]["bool"]["must_not"] = [{"ids": {"values": [similar]}}]
                 logging.info("query: %s", query)
             else:
                 logging.warning("No genre found for film with id: %s", similar)
@@ -243,25 +558,7 @@ class MultipleFilmsService(BaseService):
                 {"nested": {"path": "genre", "query": {"term": {"genre.uuid": genre}}}}
             )
             logging.info("genre: %s", genre)
-        logging.info(f"Query to Elasticsearch: {pformat(query)}")
-        try:
-            similar_response = await self.search_engine.search(
-                index="movies", body=query
-            )
-            logging.debug(f"Response from Elasticsearch: {pformat(similar_response)}")
-        except Exception as e:
-            logging.error(f"Error while querying Elasticsearch: {str(e)}")
-            raise HTTPException(
-                status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e)
-            )
-
-        if not similar_response["hits"]["hits"]:
-            return []
-
-        films_page = [
-            Film(**hit["_source"]) for hit in similar_response["hits"]["hits"]
-        ]
-        return films_page
+        return query
 
     # 2.3 Полнотекстовый поиск по фильмам:
     async def _fulltext_search_films_in_elastic(
@@ -269,50 +566,73 @@ class MultipleFilmsService(BaseService):
         query: str,
         page_number: int,
         page_size: int,
+        fields: Optional[list[str]] = None,
     ):
         search_results = await self.search_engine.search(
             index="movies",
             body={
                 "query": {"match": {"title": query}},
+                "_source": self._source_filter(fields),
                 "from": (page_number - 1) * page_size,
                 "size": page_size,
             },
         )
         logging.debug(search_results)
-        return [Film(**hit["_source"]) for hit in search_results["hits"]["hits"]]
+        return self._films_from_hits(search_results["hits"]["hits"], fields)
 
     # 3.2. получение страницы списка фильмов отсортированных по популярности из кэша
-    async def _get_multiple_films_from_cache(self, cache_key: str):
-        films_data = await self.cache.get(cache_key)
+    async def _get_multiple_films_from_cache(
+        self, cache_key: str, fields: Optional[list[str]] = None
+    ) -> Optional[CachedValue]:
+        loader = FILMS_PROJECTION_PAGE_LOADER if fields else FILMS_PAGE_LOADER
+        films_data = await self.cache.get_model(cache_key, loader)
         if not films_data:
             logging.info("Не найдено в кэш")
             return None
 
         logging.info("Взято из кэша по ключу: {0}".format(cache_key))
-        return FILM_ADAPTER.validate_json(films_data)
+        return films_data
 
     # 4.2. сохранение страницы фильмов (отсортированных по популярности) в кэш:
-    async def _put_multiple_films_to_cache(self, cache_key: str, films):
-        await self.cache.set(
+    async def _put_multiple_films_to_cache(
+        self,
+        cache_key: str,
+        films,
+        delta: float = 0.0,
+        fields: Optional[list[str]] = None,
+        similar: Optional[str] = None,
+        ranking: Optional[str] = None,
+    ):
+        films = films or []
+        if fields:
+            payload = FILM_PROJECTION_ADAPTER.dump_json(films)
+            film_uuids = [film["uuid"] for film in films]
+        else:
+            payload = FILM_ADAPTER.dump_json(films)
+            film_uuids = [film.uuid for film in films]
+        await self._put_page(
             cache_key,
-            FILM_ADAPTER.dump_json(films),
-            settings.cache_time_life,
+            payload,
+            delta,
+            ttl=settings.cache_time_life,
+            # Страница similar= зависит и от жанров исходного фильма,
+            # страница рейтинга - и от фильмов, которые могут на неё попасть
+            tags=[
+                entity_tag("film", film_uuid)
+                for film_uuid in film_uuids + ([similar] if similar else [])
+            ]
+            + ([entity_tag(RANKING_ENTITY, ranking)] if ranking else []),
         )
 
 
-@lru_cache()
-def get_film_service(
-    cache: AsyncCache = Depends(get_cache_service),
-    elastic: AsyncSearchEngine = Depends(get_search_engine),
-) -> FilmService:
-    print(f"Cache: {cache}, Elastic: {elastic}")
-    return FilmService(cache=cache, search_engine=elastic)
+# Экземпляры сервисов создаются один раз при старте приложения (main.lifespan)
+film_service: Optional[FilmService] = None
+multiple_films_service: Optional[MultipleFilmsService] = None
+
+
+def get_film_service() -> FilmService:
+    return film_service
 
 
-@lru_cache()
-def get_multiple_films_service(
-    cache: AsyncCache = Depends(get_cache_service),
-    elastic: AsyncSearchEngine = Depends(get_search_engine),
-) -> MultipleFilmsService:
-    print(f"Cache: {cache}, Elastic: {elastic}")
-    return MultipleFilmsService(cache=cache, search_engine=elastic)
+def get_multiple_films_service() -> MultipleFilmsService:
+    return multiple_films_service
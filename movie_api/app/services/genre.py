@@ -1,40 +1,64 @@
-import json
-from functools import lru_cache
 from typing import List, Optional, Tuple
 
-from db.elastic import get_search_engine
-from db.interfaces import AsyncCache, AsyncSearchEngine
-from db.redis import get_cache_service
+from db.swr import SWRLoader
 from elasticsearch import NotFoundError
-from fastapi import Depends, HTTPException
+from fastapi import HTTPException
 from models.genre import Genre
-from services.base_service import BaseService
+from pydantic import TypeAdapter
+from services.base_service import BaseService, entity_tag, schema_version
+
+GENRES_PAGE_ADAPTER = TypeAdapter(Tuple[List[Genre], int])
+GENRES_PAGE_LOADER = SWRLoader(GENRES_PAGE_ADAPTER.validate_json)
+GENRE_SCHEMA = schema_version(Genre)
+
+# Кеш на 5 минут
+GENRE_CACHE_TTL = 300
 
 
 class GenreService(BaseService):
     """Сервис для получения информации о жанре/жанрах из ES."""
 
-    async def get_by_uuid(self, genre_id: str) -> Optional[Genre]:
+    def cache_keys(self, entity_id: str) -> list[str]:
+        return [self._get_genre_cache_key(entity_id)]
 
+    def _get_genre_cache_key(self, genre_id: str) -> str:
         params_to_key = {
             "uuid": genre_id,
+            "schema": GENRE_SCHEMA,
         }
-        cache_key = self.cache.generate_cache_key(
+        return self.cache.generate_cache_key(
             index="genres", params_to_key=params_to_key
         )
 
-        cached_genre = await self.cache.get(key=cache_key)
-        if cached_genre:
-            return Genre(**json.loads(cached_genre))
+    async def get_by_uuid(self, genre_id: str) -> Optional[Genre]:
+        cache_key = self._get_genre_cache_key(genre_id)
 
+        cached_genre = await self.cache.get_model(
+            key=cache_key, loader=Genre.model_validate_json
+        )
+        if cached_genre:
+            return cached_genre
+        return await self._load_genre_to_cache(genre_id)
+
+    async def get_json_by_uuid(self, genre_id: str) -> Optional[str | bytes]:
+        """Жанр в виде JSON ответа API: значение из кеша отдаётся без разбора."""
+        payload = await self.cache.get(self._get_genre_cache_key(genre_id))
+        if payload:
+            return payload
+        genre = await self._load_genre_to_cache(genre_id)
+        return genre.model_dump_json() if genre else None
+
+    async def _load_genre_to_cache(self, genre_id: str) -> Optional[Genre]:
         try:
             doc = await self.search_engine.get(index="genres", id=genre_id)
         except NotFoundError:
             return None
         genre = Genre(**doc["_source"])
         await self.cache.set(
-            cache_key, genre.model_dump_json(), ex=300
-        )  # Кеш на 5 минут
+            self._get_genre_cache_key(genre_id),
+            genre.model_dump_json(),
+            ex=GENRE_CACHE_TTL,
+        )
         return genre
 
     async def search(
@@ -55,13 +79,30 @@ class GenreService(BaseService):
             index="genres", params_to_key=params_to_key
         )
 
-        cached_genres = await self.cache.get(key=cache_key)
-        if cached_genres:
-            data = json.loads(cached_genres)
-            return [Genre.model_validate_json(genre) for genre in data["items"]], data[
-                "total"
-            ]
+        return await self._get_or_compute(
+            cache_key,
+            get_cached=lambda: self.cache.get_model(
+                key=cache_key, loader=GENRES_PAGE_LOADER
+            ),
+            compute=lambda: self._search_genres_in_elastic(
+                query=query, order=order, page_number=page_number, page_size=page_size
+            ),
+            put=lambda genres_page, delta: self._put_page(
+                cache_key,
+                GENRES_PAGE_ADAPTER.dump_json(genres_page),
+                delta,
+                ttl=GENRE_CACHE_TTL,
+                tags=[entity_tag("genre", genre.uuid) for genre in genres_page[0]],
+            ),
+        )
 
+    async def _search_genres_in_elastic(
+        self,
+        query: str,
+        order: str,
+        page_number: int,
+        page_size: int,
+    ) -> Tuple[List[Genre], int]:
         body = {}
         if query:
             body["query"] = {
@@ -88,19 +129,12 @@ class GenreService(BaseService):
         if (page_number - 1) * page_size >= total:
             raise HTTPException(status_code=404, detail="Page not found")
 
-        await self.cache.set(
-            cache_key,
-            json.dumps(
-                {"items": [genre.model_dump_json() for genre in genres], "total": total}
-            ),
-            ex=300,
-        )  # Кеш на 5 минут
         return genres, total
 
 
-@lru_cache()
-def get_genre_service(
-    cache: AsyncCache = Depends(get_cache_service),
-    elastic: AsyncSearchEngine = Depends(get_search_engine),
-) -> GenreService:
-    return GenreService(cache=cache, search_engine=elastic)
+# Экземпляр сервиса создаётся один раз при старте приложения (main.lifespan)
+genre_service: Optional[GenreService] = None
+
+
+def get_genre_service() -> GenreService:
+    return genre_service
@@ -0,0 +1,27 @@
+import base64
+import binascii
+import json
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import HTTPException
+
+# Заголовок ответа, в котором возвращается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(pit_id: str, search_after: list) -> str:
+    """Упаковать point-in-time и позицию в непрозрачный курсор."""
+    state = json.dumps({"pit": pit_id, "after": search_after}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(state.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[str], Optional[list]]:
+    """Распаковать курсор. Пустой курсор означает начало новой выборки."""
+    if not cursor:
+        return None, None
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(state["pit"]), list(state["after"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
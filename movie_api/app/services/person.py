@@ -1,111 +1,188 @@
-from functools import lru_cache
-from typing import List
+import logging
+from http import HTTPStatus
+from typing import List, Optional
 
-from db.elastic import get_search_engine
-from db.interfaces import AsyncCache, AsyncSearchEngine
-from db.redis import get_cache_service
+from db.swr import SWRLoader, pack
 from elasticsearch import NotFoundError
-from fastapi import Depends
+from fastapi import HTTPException
 from models.person import (
     FilmRating,
     PersonFilm,
-    PersonRoleInFilms,
     PersonWithFilms,
     PortfolioFilm,
 )
 from pydantic import TypeAdapter
-from services.base_service import BaseService
+from services.base_service import BaseService, entity_tag, schema_version
 
 PERSONFILM_ADAPTER = TypeAdapter(PersonFilm)
 LISTPERSONFILM_ADAPTER = TypeAdapter(list[PersonFilm])
 FILMRATING_ADAPTER = TypeAdapter(list[FilmRating])
+LISTPERSONFILM_LOADER = SWRLoader(LISTPERSONFILM_ADAPTER.validate_json)
+FILMRATING_LOADER = SWRLoader(FILMRATING_ADAPTER.validate_json)
+PERSONFILM_SCHEMA = schema_version(PersonFilm)
+
+# Кеш на 5 минут
+PERSON_CACHE_TTL = 300
+
+logger = logging.getLogger(__name__)
+
+# Максимальное количество фильмов персоны, запрашиваемых из ES
+PERSON_FILMS_LIMIT = 999
 
 
 class PersonService(BaseService):
 
+    def cache_keys(self, entity_id: str) -> list[str]:
+        return [
+            self._get_person_cache_key(entity_id),
+            self._get_person_films_cache_key(entity_id),
+        ]
+
+    def _get_person_cache_key(self, person_id: str) -> str:
+        params_to_key = {
+            "query": "get_by_uuid",
+            "person_id": str(person_id),
+            "schema": PERSONFILM_SCHEMA,
+        }
+        return self.cache.generate_cache_key("person", params_to_key)
+
+    def _get_person_films_cache_key(self, person_id: str) -> str:
+        params_to_key = {
+            "query": "get_film_detail_on_person",
+            "person_id": str(person_id),
+        }
+        return self.cache.generate_cache_key("person", params_to_key)
+
     async def get_by_uuid(self, person_id: str) -> PersonFilm:
-        params_to_key = {"query": "get_by_uuid", "person_id": str(person_id)}
-        cache_key = self.cache.generate_cache_key("person", params_to_key)
-        person = await self.cache.get(cache_key)
+        cache_key = self._get_person_cache_key(person_id)
+        person = await self.cache.get_model(cache_key, PERSONFILM_ADAPTER.validate_json)
         if person:
-            return PERSONFILM_ADAPTER.validate_json(person)
+            return person
+        return await self._load_person_to_cache(person_id)
+
+    async def get_json_by_uuid(self, person_id: str) -> Optional[str | bytes]:
+        """Персона в виде JSON ответа API: значение из кеша отдаётся без разбора."""
+        payload = await self.cache.get(self._get_person_cache_key(person_id))
+        if payload:
+            return payload
+        person = await self._load_person_to_cache(person_id)
+        return PERSONFILM_ADAPTER.dump_json(person) if person else None
+
+    async def _load_person_to_cache(self, person_id: str) -> Optional[PersonFilm]:
         person = await self.get_person_from_elastic(person_id)
         if not person:
             return None
-        await self.cache.set(cache_key, PERSONFILM_ADAPTER.dump_json(person), ex=300)
+        await self.cache.set(
+            self._get_person_cache_key(person_id),
+            PERSONFILM_ADAPTER.dump_json(person),
+            ex=PERSON_CACHE_TTL,
+        )
         return person
 
     async def get_person_from_elastic(self, person_id: str) -> PersonWithFilms | None:
-        person_name = await self._get_person_name_from_elastic(person_id=person_id)
-        if not person_name:
+        person_doc = await self._get_person_doc_from_elastic(person_id=person_id)
+        if not person_doc:
             return
-        films = await self._get_uuid_roles_in_films(person_id=person_id)
-        return PersonFilm(uuid=person_id, full_name=person_name, films=films)
+        if "films" in person_doc:
+            # Документ, собранный ETL, уже содержит фильмы и роли персоны
+            films = [PortfolioFilm(**film) for film in person_doc["films"]]
+        else:
+            films = await self._get_uuid_roles_in_films(person_id=person_id)
+        return PersonFilm(
+            uuid=person_id, full_name=person_doc["full_name"], films=films
+        )
 
-    async def _get_uuid_roles_in_films(self, person_id: str) -> list[PersonRoleInFilms]:
+    async def _get_uuid_roles_in_films(self, person_id: str) -> list[PortfolioFilm]:
         films_doc = await self.search_engine.search(
             index="movies",
-            body={
-                "query": {
-                    "bool": {
-                        "should": [
-                            {
-                                "nested": {
-                                    "path": "directors",
-                                    "query": {
-                                        "bool": {
-                                            "should": {
-                                                "term": {"directors.uuid": person_id}
-                                            }
-                                        }
-                                    },
-                                }
-                            },
-                            {
-                                "nested": {
-                                    "path": "writers",
-                                    "query": {
-                                        "bool": {
-                                            "should": {
-                                                "term": {"writers.uuid": person_id}
-                                            }
-                                        }
-                                    },
-                                }
-                            },
-                            {
-                                "nested": {
-                                    "path": "actors",
-                                    "query": {
-                                        "bool": {
-                                            "should": {
-                                                "term": {"actors.uuid": person_id}
-                                            }
-                                        }
-                                    },
+            body={"query": self._films_by_person_query(person_id)},
+            size=PERSON_FILMS_LIMIT,
+        )
+        hits_list = films_doc.body.get("hits", {}).get("hits", [])
+        return self._get_roles_from_hits(person_id, hits_list)
+
+    async def _get_uuid_roles_in_films_for_persons(
+        self, person_ids: list[str]
+    ) -> dict[str, list[PortfolioFilm]]:
+        """Фильмы и роли сразу для нескольких персон за один запрос msearch."""
+        if not person_ids:
+            return {}
+        searches = []
+        for person_id in person_ids:
+            searches.append({"index": "movies"})
+            searches.append(
+                {
+                    "query": self._films_by_person_query(person_id),
+                    "size": PERSON_FILMS_LIMIT,
+                    "_source": [
+                        "uuid",
+                        "actors.uuid",
+                        "writers.uuid",
+                        "directors.uuid",
+                    ],
+                }
+            )
+        films_docs = await self.search_engine.msearch(searches=searches)
+        responses = films_docs.body["responses"]
+        for person_id, response in zip(person_ids, responses):
+            # Ошибка подзапроса - не "нет фильмов": такой ответ нельзя кешировать
+            if "error" in response:
+                logger.error(
+                    "Films search for person %s failed: %s",
+                    person_id,
+                    response["error"],
+                )
+                raise HTTPException(
+                    status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                    detail="Films search failed",
+                )
+        return {
+            person_id: self._get_roles_from_hits(
+                person_id, response.get("hits", {}).get("hits", [])
+            )
+            for person_id, response in zip(person_ids, responses)
+        }
+
+    @staticmethod
+    def _films_by_person_query(person_id: str) -> dict:
+        """Запрос фильмов, в которых персона была режиссёром, сценаристом или актёром."""
+        return {
+            "bool": {
+                "should": [
+                    {
+                        "nested": {
+                            "path": role,
+                            "query": {
+                                "bool": {
+                                    "should": {"term": {f"{role}.uuid": person_id}}
                                 }
                             },
-                        ]
+                        }
                     }
-                }
-            },
-            size=999,
-        )
-        hits_list = films_doc.body.get("hits", {}).get("hits", [])
+                    for role in ("directors", "writers", "actors")
+                ]
+            }
+        }
+
+    @staticmethod
+    def _get_roles_from_hits(
+        person_id: str, hits_list: list[dict]
+    ) -> list[PortfolioFilm]:
         films = []
         for hit in hits_list:
             source = hit["_source"]
             uuid = source["uuid"]
             roles = []
-            for actor_in_film in source["actors"]:
+            # Фильтр _source не возвращает пустые и отсутствующие списки
+            for actor_in_film in source.get("actors", []):
                 if actor_in_film["uuid"] == person_id:
                     roles.append("actors")
 
-            for writer_in_film in source["writers"]:
+            for writer_in_film in source.get("writers", []):
                 if writer_in_film["uuid"] == person_id:
                     roles.append("writer")
 
-            for director_in_film in source["directors"]:
+            for director_in_film in source.get("directors", []):
                 if director_in_film["uuid"] == person_id:
                     roles.append("director")
             films.append(PortfolioFilm(uuid=uuid, roles=roles))
@@ -121,18 +198,21 @@ class PersonService(BaseService):
             "page_number": str(page_number),
         }
         cache_key = self.cache.generate_cache_key("person", params_to_key)
-        persons = await self.cache.get(cache_key)
-        if persons == b"null":
-            persons = None
-        if persons:
-            return LISTPERSONFILM_ADAPTER.validate_json(persons)
-        persons = await self._get_films_by_person_full_name_from_elastic(
-            search_str=search_str,
-            page_size=page_size,
-            page_number=page_number,
-        )
-        await self.cache.set(
-            cache_key, LISTPERSONFILM_ADAPTER.dump_json(persons), ex=300
+        persons = await self._get_or_compute(
+            cache_key,
+            get_cached=lambda: self.cache.get_model(cache_key, LISTPERSONFILM_LOADER),
+            compute=lambda: self._get_films_by_person_full_name_from_elastic(
+                search_str=search_str,
+                page_size=page_size,
+                page_number=page_number,
+            ),
+            put=lambda persons, delta: self._put_page(
+                cache_key,
+                LISTPERSONFILM_ADAPTER.dump_json(persons or []),
+                delta,
+                ttl=PERSON_CACHE_TTL,
+                tags=[entity_tag("person", person.uuid) for person in persons or []],
+            ),
         )
         if not persons:
             return []
@@ -151,83 +231,81 @@ class PersonService(BaseService):
             },
         )
         persons_hit_list = search_results.body.get("hits", {}).get("hits", [])
-        films_by_person = []
-        for person_hit in persons_hit_list:
-            person_uuid = person_hit["_source"]["uuid"]
-            full_name = person_hit["_source"]["full_name"]
-            films = await self._get_uuid_roles_in_films(person_id=person_uuid)
-            films_by_person.append(
-                PersonFilm(uuid=person_uuid, full_name=full_name, films=films)
-            )
+        films_by_person = await self._persons_from_hits(persons_hit_list)
         if not films_by_person:
             return
         return films_by_person
 
-    async def get_film_detail_on_person(self, person_id: str) -> list[FilmRating]:
-        params_to_key = {
-            "query": "get_film_detail_on_person",
-            "person_id": str(person_id),
+    async def search_by_cursor(
+        self, search_str: str, cursor: str, page_size: int = 50
+    ) -> tuple[List[PersonFilm], Optional[str]]:
+        """Поиск персон по имени с пагинацией по курсору."""
+        persons_hit_list, next_cursor = await self._search_by_cursor(
+            index="persons",
+            body={"query": {"match": {"full_name": search_str}}, "sort": ["_score"]},
+            cursor=cursor,
+            page_size=page_size,
+        )
+        return await self._persons_from_hits(persons_hit_list), next_cursor
+
+    async def _persons_from_hits(
+        self, persons_hit_list: list[dict]
+    ) -> List[PersonFilm]:
+        films = {
+            person_hit["_source"]["uuid"]: [
+                PortfolioFilm(**film) for film in person_hit["_source"]["films"]
+            ]
+            for person_hit in persons_hit_list
+            if "films" in person_hit["_source"]
         }
-        cache_key = self.cache.generate_cache_key("person", params_to_key)
-        films_rated = await self.cache.get(cache_key)
-        if films_rated:
-            return FILMRATING_ADAPTER.validate_json(films_rated)
-        films_rated = await self._get_film_details_by_person_id(person_id=person_id)
-        await self.cache.set(
-            cache_key, FILMRATING_ADAPTER.dump_json(films_rated), ex=300
+        # Фильмы персон без готового списка запрашиваются одним msearch
+        films.update(
+            await self._get_uuid_roles_in_films_for_persons(
+                [
+                    person_hit["_source"]["uuid"]
+                    for person_hit in persons_hit_list
+                    if "films" not in person_hit["_source"]
+                ]
+            )
+        )
+        return [
+            PersonFilm(
+                uuid=person_hit["_source"]["uuid"],
+                full_name=person_hit["_source"]["full_name"],
+                films=films[person_hit["_source"]["uuid"]],
+            )
+            for person_hit in persons_hit_list
+        ]
+
+    async def get_film_detail_on_person(self, person_id: str) -> list[FilmRating]:
+        cache_key = self._get_person_films_cache_key(person_id)
+        films_rated = await self._get_or_compute(
+            cache_key,
+            get_cached=lambda: self.cache.get_model(cache_key, FILMRATING_LOADER),
+            compute=lambda: self._get_film_details_by_person_id(person_id=person_id),
+            put=lambda films_rated, delta: self.cache.set(
+                cache_key,
+                pack(
+                    FILMRATING_ADAPTER.dump_json(films_rated),
+                    delta,
+                    ttl=PERSON_CACHE_TTL,
+                ),
+                ex=self._hard_ttl(PERSON_CACHE_TTL),
+            ),
         )
         if not films_rated:
             return []
         return films_rated
 
     async def _get_film_details_by_person_id(self, person_id: str) -> list[FilmRating]:
+        person_doc = await self._get_person_doc_from_elastic(person_id=person_id)
+        if person_doc and "films" in person_doc:
+            return [FilmRating(**film) for film in person_doc["films"]]
+
         films_doc = await self.search_engine.search(
             index="movies",
-            body={
-                "query": {
-                    "bool": {
-                        "should": [
-                            {
-                                "nested": {
-                                    "path": "directors",
-                                    "query": {
-                                        "bool": {
-                                            "should": {
-                                                "term": {"directors.uuid": person_id}
-                                            }
-                                        }
-                                    },
-                                }
-                            },
-                            {
-                                "nested": {
-                                    "path": "writers",
-                                    "query": {
-                                        "bool": {
-                                            "should": {
-                                                "term": {"writers.uuid": person_id}
-                                            }
-                                        }
-                                    },
-                                }
-                            },
-                            {
-                                "nested": {
-                                    "path": "actors",
-                                    "query": {
-                                        "bool": {
-                                            "should": {
-                                                "term": {"actors.uuid": person_id}
-                                            }
-                                        }
-                                    },
-                                }
-                            },
-                        ]
-                    }
-                }
-            },
-            size=999,
+            body={"query": self._films_by_person_query(person_id)},
+            size=PERSON_FILMS_LIMIT,
         )
         hits_list = films_doc.body.get("hits", {}).get("hits", [])
         films = []
@@ -242,19 +320,18 @@ class PersonService(BaseService):
             )
         return films
 
-    async def _get_person_name_from_elastic(self, person_id: str) -> str | None:
+    async def _get_person_doc_from_elastic(self, person_id: str) -> dict | None:
         try:
             person_doc = await self.search_engine.get(index="persons", id=person_id)
         except NotFoundError:
             return None
 
-        return person_doc.body["_source"]["full_name"]
+        return person_doc.body["_source"]
+
+
+# Экземпляр сервиса создаётся один раз при старте приложения (main.lifespan)
+person_service: Optional[PersonService] = None
 
 
-@lru_cache()
-def get_person_service(
-    cache: AsyncCache = Depends(get_cache_service),
-    elastic: AsyncSearchEngine = Depends(get_search_engine),
-) -> PersonService:
-    print(f"Cache: {cache}, Elastic: {elastic}")
-    return PersonService(cache=cache, search_engine=elastic)
+def get_person_service() -> PersonService:
+    return person_service
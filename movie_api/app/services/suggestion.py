@@ -0,0 +1,103 @@
+import logging
+from typing import Optional
+
+from core.config import settings
+from core.metrics import cache_requests_total
+from db.memory import LRUCache
+from db.singleflight import singleflight
+from models.suggestion import Suggestions
+from services.base_service import BaseService
+
+logger = logging.getLogger(__name__)
+
+# Поля search_as_you_type: само поле и его shingle-подполя
+FILM_SUGGEST_FIELDS = ["title_suggest", "title_suggest._2gram", "title_suggest._3gram"]
+PERSON_SUGGEST_FIELDS = [
+    "full_name_suggest",
+    "full_name_suggest._2gram",
+    "full_name_suggest._3gram",
+]
+
+# Короткие префиксы запрашиваются чаще всего и их немного, поэтому ответы
+# на них держим в памяти воркера, не обращаясь ни к Redis, ни к ES.
+# Размер считается по JSON, а объект ответа хранится рядом с ним
+prefix_cache = LRUCache(
+    max_items=settings.suggest_cache_max_items,
+    max_bytes=settings.suggest_cache_max_items * 4096,
+    size_gauge=None,
+)
+
+
+class SuggestService(BaseService):
+    """Подсказки по началу названия фильма и имени персоны."""
+
+    async def suggest(self, prefix: str, size: int) -> Suggestions:
+        prefix = " ".join(prefix.lower().split())
+        if not prefix:
+            return Suggestions(films=[], persons=[])
+        if len(prefix) > settings.suggest_cache_prefix_len:
+            return await self._suggest_from_elastic(prefix, size)
+
+        cache_key = f"{prefix}::{size}"
+        entry = prefix_cache.get_entry(cache_key)
+        if entry is not None:
+            cache_requests_total.labels(tier="suggest", result="hit").inc()
+            return entry.parsed
+        cache_requests_total.labels(tier="suggest", result="miss").inc()
+        return await singleflight.do(
+            f"suggest::{cache_key}",
+            lambda: self._load_to_cache(cache_key, prefix, size),
+        )
+
+    async def _load_to_cache(self, cache_key: str, prefix: str, size: int):
+        suggestions = await self._suggest_from_elastic(prefix, size)
+        prefix_cache.set(
+            cache_key, suggestions.model_dump_json(), settings.suggest_cache_ttl
+        )
+        prefix_cache.remember_parsed(
+            cache_key, Suggestions.model_validate_json, suggestions
+        )
+        return suggestions
+
+    async def _suggest_from_elastic(self, prefix: str, size: int) -> Suggestions:
+        # Фильмы и персоны - одним запросом _msearch
+        response = await self.search_engine.msearch(
+            searches=[
+                {"index": "movies"},
+                self._suggest_query(prefix, size, FILM_SUGGEST_FIELDS, "title"),
+                {"index": "persons"},
+                self._suggest_query(prefix, size, PERSON_SUGGEST_FIELDS, "full_name"),
+            ]
+        )
+        films, persons = (self._sources(result) for result in response["responses"])
+        return Suggestions(films=films, persons=persons)
+
+    @staticmethod
+    def _suggest_query(prefix: str, size: int, fields: list[str], name: str) -> dict:
+        return {
+            "size": size,
+            "_source": ["uuid", name],
+            "query": {
+                "multi_match": {
+                    "query": prefix,
+                    "type": "bool_prefix",
+                    "fields": fields,
+                }
+            },
+        }
+
+    @staticmethod
+    def _sources(result: dict) -> list[dict]:
+        if "error" in result:
+            # Индекс без поля suggest или недоступен: подсказок по нему нет
+            logger.warning("Suggest query failed: %s", result["error"])
+            return []
+        return [hit["_source"] for hit in result["hits"]["hits"]]
+
+
+# Экземпляр сервиса создаётся один раз при старте приложения (main.lifespan)
+suggest_service: Optional[SuggestService] = None
+
+
+def get_suggest_service() -> SuggestService:
+    return suggest_service
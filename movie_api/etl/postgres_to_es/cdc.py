@@ -0,0 +1,246 @@
+import select
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import backoff
+import psycopg2
+from config import settings
+from logger import logger
+from psycopg2 import errors, sql
+from psycopg2.extras import LogicalReplicationConnection
+from sqlalchemy.engine import make_url
+
+SCHEMA = "content"
+TABLES = ("film_work", "genre", "person", "genre_film_work", "person_film_work")
+# Link tables log whole old rows, so that their deletes carry both ids
+FULL_IDENTITY_TABLES = ("genre_film_work", "person_film_work")
+
+Row = Dict[str, Optional[str]]
+
+
+class PgOutputDecoder:
+    """Decode pgoutput (protocol version 1) messages into row changes.
+
+    A relation message describes a table before its first change in a
+    replication session, row messages refer to the table by its OID.
+    Column values come in text format.
+    """
+
+    def __init__(self):
+        self.relations: Dict[int, Tuple[str, str, List[str]]] = {}
+
+    def decode(self, payload: bytes) -> Optional[Tuple[str, str, Row]]:
+        """Return (table, action, row) of a row change, None for other messages."""
+        kind = payload[:1]
+        if kind == b"R":
+            self._relation(payload)
+            return None
+        if kind not in (b"I", b"U", b"D"):
+            # Transaction boundaries, types, origins; truncates are not replicated
+            return None
+
+        (relation_id,) = struct.unpack_from("!I", payload, 1)
+        schema, table, columns = self.relations[relation_id]
+        offset = 5
+        if kind == b"U" and payload[offset : offset + 1] in (b"K", b"O"):
+            # The old key or row precedes the new row, which has all the ids
+            _, offset = self._tuple(payload, offset + 1)
+        values, _ = self._tuple(payload, offset + 1)
+        if schema != SCHEMA:
+            return None
+        return table, kind.decode(), dict(zip(columns, values))
+
+    def _relation(self, payload: bytes) -> None:
+        (relation_id,) = struct.unpack_from("!I", payload, 1)
+        schema, offset = self._string(payload, 5)
+        table, offset = self._string(payload, offset)
+        # Skip replica identity setting
+        (column_count,) = struct.unpack_from("!H", payload, offset + 1)
+        offset += 3
+        columns = []
+        for _ in range(column_count):
+            # Skip flags before the name, type OID and modifier after it
+            name, offset = self._string(payload, offset + 1)
+            offset += 8
+            columns.append(name)
+        self.relations[relation_id] = (schema, table, columns)
+
+    @staticmethod
+    def _string(payload: bytes, offset: int) -> Tuple[str, int]:
+        end = payload.index(b"\0", offset)
+        return payload[offset:end].decode("utf-8"), end + 1
+
+    @staticmethod
+    def _tuple(payload: bytes, offset: int) -> Tuple[List[Optional[str]], int]:
+        (column_count,) = struct.unpack_from("!H", payload, offset)
+        offset += 2
+        values = []
+        for _ in range(column_count):
+            kind = payload[offset : offset + 1]
+            offset += 1
+            if kind == b"t":
+                (length,) = struct.unpack_from("!I", payload, offset)
+                offset += 4
+                values.append(payload[offset : offset + length].decode("utf-8"))
+                offset += length
+            else:
+                # NULL or an unchanged TOASTed value, neither is an id
+                values.append(None)
+        return values, offset
+
+
+@dataclass
+class ChangeSet:
+    """IDs of rows touched by a batch of replicated changes."""
+
+    movies: Set[str] = field(default_factory=set)
+    genres: Set[str] = field(default_factory=set)
+    persons: Set[str] = field(default_factory=set)
+    # Persons whose film lists changed, but not the persons themselves
+    linked_persons: Set[str] = field(default_factory=set)
+    deleted_movies: Set[str] = field(default_factory=set)
+    deleted_genres: Set[str] = field(default_factory=set)
+    deleted_persons: Set[str] = field(default_factory=set)
+    size: int = 0
+
+    def add(self, table: str, action: str, row: Row) -> None:
+        self.size += 1
+        if table in FULL_IDENTITY_TABLES:
+            if row.get("film_work_id"):
+                self.movies.add(row["film_work_id"])
+            if row.get("person_id"):
+                self.linked_persons.add(row["person_id"])
+            return
+
+        upserted, deleted = {
+            "film_work": (self.movies, self.deleted_movies),
+            "genre": (self.genres, self.deleted_genres),
+            "person": (self.persons, self.deleted_persons),
+        }[table]
+        if action == "D":
+            upserted.discard(row["id"])
+            deleted.add(row["id"])
+        else:
+            deleted.discard(row["id"])
+            upserted.add(row["id"])
+
+
+def apply_with_retry(apply: Callable[[ChangeSet], None], changes: ChangeSet, cursor):
+    """Apply a batch, retrying the same changes until it succeeds.
+
+    The slot position is not confirmed meanwhile. Feedback is still sent
+    between attempts, so the server does not drop the idle connection.
+    """
+    delay = 1.0
+    while True:
+        try:
+            apply(changes)
+            return
+        except Exception as e:
+            logger.error(
+                f"Failed to apply {changes.size} changes, retrying in {delay:.0f}s: {e}"
+            )
+        cursor.send_feedback()
+        time.sleep(delay)
+        delay = min(delay * 2, settings.cdc_feedback_interval)
+
+
+def replication_dsn() -> str:
+    # POSTGRES_DSN is an SQLAlchemy URL, psycopg2 needs a plain libpq one
+    return (
+        make_url(settings.postgres_dsn)
+        .set(drivername="postgresql")
+        .render_as_string(hide_password=False)
+    )
+
+
+def setup_publication() -> None:
+    """Create the publication of the content tables if it does not exist."""
+    connection = psycopg2.connect(replication_dsn())
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_publication WHERE pubname = %s",
+                (settings.cdc_publication_name,),
+            )
+            if cursor.fetchone() is None:
+                logger.info(f"Creating publication {settings.cdc_publication_name}")
+                cursor.execute(
+                    sql.SQL("CREATE PUBLICATION {} FOR TABLE {}").format(
+                        sql.Identifier(settings.cdc_publication_name),
+                        sql.SQL(", ").join(
+                            sql.Identifier(SCHEMA, table) for table in TABLES
+                        ),
+                    )
+                )
+            for table in FULL_IDENTITY_TABLES:
+                cursor.execute(
+                    sql.SQL("ALTER TABLE {} REPLICA IDENTITY FULL").format(
+                        sql.Identifier(SCHEMA, table)
+                    )
+                )
+    finally:
+        connection.close()
+
+
+@backoff.on_exception(
+    backoff.expo,
+    (psycopg2.OperationalError, ConnectionError),
+    max_time=settings.backoff_max_time,
+)
+def consume_changes(apply: Callable[[ChangeSet], None]) -> None:
+    """Apply changes of the content tables as they are committed.
+
+    Changes are read from a pgoutput logical replication slot and applied
+    in batches: a batch is flushed once the stream has no pending messages
+    or it reaches batch_size changes. A failed batch is retried, and the
+    slot position is confirmed only after it is applied, so after a restart
+    the changes are delivered again. The slot keeps changes made while the
+    ETL is down; the initial load is done by the polling mode.
+    """
+    setup_publication()
+    connection = psycopg2.connect(
+        replication_dsn(), connection_factory=LogicalReplicationConnection
+    )
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.create_replication_slot(
+                settings.cdc_slot_name, output_plugin="pgoutput"
+            )
+            logger.info(f"Created replication slot {settings.cdc_slot_name}")
+        except errors.DuplicateObject:
+            pass
+        cursor.start_replication(
+            slot_name=settings.cdc_slot_name,
+            decode=False,
+            options={
+                "proto_version": "1",
+                "publication_names": settings.cdc_publication_name,
+            },
+        )
+        logger.info(f"Consuming changes from slot {settings.cdc_slot_name}...")
+
+        decoder = PgOutputDecoder()
+        changes, last_lsn = ChangeSet(), 0
+        while True:
+            message = cursor.read_message()
+            if message is not None:
+                change = decoder.decode(message.payload)
+                if change:
+                    changes.add(*change)
+                last_lsn = max(last_lsn, message.data_start)
+                if changes.size < settings.batch_size:
+                    continue
+            if changes.size:
+                apply_with_retry(apply, changes, cursor)
+                changes = ChangeSet()
+            # Also serves as the keepalive reply while the stream is idle
+            cursor.send_feedback(flush_lsn=last_lsn)
+            if message is None:
+                select.select([cursor], [], [], settings.cdc_feedback_interval)
+    finally:
+        connection.close()
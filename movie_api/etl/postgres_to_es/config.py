@@ -14,6 +14,33 @@ class Settings(BaseSettings):
     log_level: str = Field("INFO", env="LOG_LEVEL")
     etl_interval_minutes: int = Field(5, env="ETL_INTERVAL_MINUTES")
     backoff_max_time: int = Field(60, env="BACKOFF_MAX_TIME")
+    cache_invalidation_stream: str = Field(
+        "cache:invalidation", env="CACHE_INVALIDATION_STREAM"
+    )
+    cache_invalidation_maxlen: int = Field(10000, env="CACHE_INVALIDATION_MAXLEN")
+    # Pipeline stages: threads per stage and batches buffered between them
+    extract_workers: int = Field(2, env="EXTRACT_WORKERS")
+    transform_workers: int = Field(2, env="TRANSFORM_WORKERS")
+    # Processes assembling documents; 0 assembles them in transform threads
+    transform_processes: int = Field(0, env="TRANSFORM_PROCESSES")
+    load_workers: int = Field(2, env="LOAD_WORKERS")
+    pipeline_queue_size: int = Field(4, env="PIPELINE_QUEUE_SIZE")
+    # Bulk indexing: chunk limits and retries of documents rejected with 429
+    es_bulk_chunk_size: int = Field(500, env="ES_BULK_CHUNK_SIZE")
+    es_bulk_max_chunk_bytes: int = Field(
+        10 * 1024 * 1024, env="ES_BULK_MAX_CHUNK_BYTES"
+    )
+    es_bulk_max_retries: int = Field(5, env="ES_BULK_MAX_RETRIES")
+    es_bulk_initial_backoff: float = Field(1, env="ES_BULK_INITIAL_BACKOFF")
+    es_bulk_max_backoff: float = Field(30, env="ES_BULK_MAX_BACKOFF")
+    # "poll" re-reads changed rows every etl_interval_minutes, "cdc" consumes
+    # a logical replication slot of the content schema
+    etl_mode: str = Field("poll", env="ETL_MODE")
+    cdc_slot_name: str = Field("etl_cdc", env="CDC_SLOT_NAME")
+    cdc_publication_name: str = Field("etl_cdc", env="CDC_PUBLICATION_NAME")
+    cdc_feedback_interval: float = Field(10, env="CDC_FEEDBACK_INTERVAL")
+    # Port of the Prometheus /metrics endpoint; 0 disables it
+    metrics_port: int = Field(8001, env="METRICS_PORT")
 
     class Config:
         env_file = ".env"
@@ -1,12 +1,23 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 import backoff
 from config import settings
 from logger import logger
-from sqlalchemy import MetaData, Table, create_engine, select
+from sqlalchemy import (
+    MetaData,
+    Table,
+    any_,
+    bindparam,
+    create_engine,
+    func,
+    literal,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.exc import DataError, OperationalError
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 metadata = MetaData(schema="content")
 
@@ -19,8 +30,8 @@ metadata = MetaData(schema="content")
 def get_session():
     logger.info("Creating session...")
     engine = create_engine(settings.postgres_dsn)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    # Thread-local sessions: pipeline stages query Postgres concurrently
+    return scoped_session(sessionmaker(bind=engine))
 
 
 session = get_session()
@@ -120,88 +131,182 @@ def extract_persons(last_modified_persons: datetime) -> List[Dict]:
         return []
 
 
-def get_genres(movie_id: str) -> List[Dict[str, str]]:
-    """Retrieve genres for a given movie."""
-    if not movie_id:
-        logger.error("Invalid movie ID: None")
-        return []
+def _film_ids_param(movie_ids: List[str]):
+    """Bind the whole batch as a single uuid[] parameter for `= ANY(:ids)`."""
+    return bindparam("ids", movie_ids, type_=ARRAY(UUID(as_uuid=False)))
+
+
+@backoff.on_exception(
+    backoff.expo,
+    OperationalError,
+    max_time=settings.backoff_max_time,
+)
+def get_genres_by_movies(movie_ids: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    """Retrieve genres for a batch of movies in one query."""
+    if not movie_ids:
+        return {}
     query = (
-        select(genre.c.name, genre.c.id)
+        select(
+            genre_film_work.c.film_work_id,
+            func.json_agg(
+                func.json_build_object("uuid", genre.c.id, "name", genre.c.name)
+            ),
+        )
         .select_from(
             genre.join(genre_film_work, genre.c.id == genre_film_work.c.genre_id),
         )
-        .where(genre_film_work.c.film_work_id == movie_id)
+        .where(genre_film_work.c.film_work_id == any_(_film_ids_param(movie_ids)))
+        .group_by(genre_film_work.c.film_work_id)
     )
     try:
         result = session.execute(query)
-        return [{"name": row[0], "uuid": str(row[1])} for row in result]
-    except DataError as e:
-        logger.error(f"DataError for movie ID {movie_id}: {e}")
-        return []
+        return {str(movie_id): genres for movie_id, genres in result}
     except Exception as e:
-        logger.error(f"Unexpected error for movie ID {movie_id}: {e}")
-        return []
+        # An empty result would index the movies without genres
+        logger.error(f"Failed to get genres of movies: {e}")
+        session.rollback()
+        raise
 
 
-def get_names(movie_id: str, role: str) -> List[str]:
-    """Retrieve names of persons with a given role for a specific movie."""
-    if not movie_id or not role:
-        logger.error("Invalid movie ID or role: movie_id=%s, role=%s", movie_id, role)
-        return []
+@backoff.on_exception(
+    backoff.expo,
+    OperationalError,
+    max_time=settings.backoff_max_time,
+)
+def get_persons_by_movies(movie_ids: List[str]) -> Dict[str, Dict[str, List[Dict]]]:
+    """Retrieve persons grouped by role for a batch of movies in one query.
 
+    Returns {movie_id: {role: [{"id": ..., "name": ...}, ...]}}.
+    """
+    if not movie_ids:
+        return {}
     query = (
-        select((person.c.full_name))
+        select(
+            person_film_work.c.film_work_id,
+            person_film_work.c.role,
+            func.json_agg(
+                func.json_build_object("id", person.c.id, "name", person.c.full_name)
+            ),
+        )
         .select_from(person.join(person_film_work))
-        .where(person_film_work.c.film_work_id == movie_id)
-        .where(person_film_work.c.role == role)
+        .where(person_film_work.c.film_work_id == any_(_film_ids_param(movie_ids)))
+        .group_by(person_film_work.c.film_work_id, person_film_work.c.role)
     )
     try:
         result = session.execute(query)
-        return [row[0] for row in result]
-    except DataError as e:
-        logger.error(f"DataError for movie ID {movie_id}: {e}")
-        return []
     except Exception as e:
-        logger.error(f"Unexpected error for movie ID {movie_id}: {e}")
-        return []
+        # An empty result would index the movies without persons
+        logger.error(f"Failed to get persons of movies: {e}")
+        session.rollback()
+        raise
 
+    persons_by_movie: Dict[str, Dict[str, List[Dict]]] = {}
+    for movie_id, role, persons in result:
+        persons_by_movie.setdefault(str(movie_id), {})[role] = persons
+    return persons_by_movie
 
-def get_persons(movie_id: str, role: str) -> List[Dict]:
-    """Retrieve persons with a given role for a specific movie."""
-    query = (
-        select(person.c.id, person.c.full_name)
-        .select_from(person.join(person_film_work))
-        .where(person_film_work.c.film_work_id == movie_id)
-        .where(person_film_work.c.role == role)
-    )
 
+def _stream_rows(query, chunk_size: int) -> Iterator[List[Dict]]:
+    """Stream query results in chunks through a server-side cursor.
+
+    Only one chunk is held in memory at a time, however many rows match.
+    """
     try:
-        result = session.execute(query).fetchall()
-        return [{"id": row[0], "name": row[1]} for row in result]
-    except DataError as e:
-        logger.error(f"DataError for movie ID {movie_id}: {e}")
-        return []
+        result = session.execute(query.execution_options(yield_per=chunk_size))
+        columns = result.keys()
+        for partition in result.partitions():
+            yield [dict(zip(columns, row)) for row in partition]
     except Exception as e:
-        logger.error(f"Unexpected error for movie ID {movie_id}: {e}")
-        return []
+        # Stopping quietly would look like the end of the rows: the run would
+        # save its state without the rest of them
+        logger.error(f"Failed to stream rows: {e}")
+        session.rollback()
+        raise
+
+
+def _movies_query():
+    return select(
+        film_work.c.id,
+        film_work.c.rating,
+        film_work.c.title,
+        film_work.c.description,
+        film_work.c.file,
+        film_work.c.modified,
+        film_work.c.creation_date,
+    ).distinct()
 
 
-def get_movies_by_genre(genre_ids: List[str]) -> List[Dict]:
-    """Retrieve all movies associated with a list of genre IDs."""
+def stream_movies_by_ids(movie_ids: List[str], chunk_size: int) -> Iterator[List[Dict]]:
+    """Stream movies with the given IDs in chunks."""
+    if not movie_ids:
+        return iter(())
+    return _stream_rows(
+        _movies_query().where(film_work.c.id.in_(movie_ids)), chunk_size
+    )
+
+
+def stream_movies_by_genre(
+    genre_ids: List[str], chunk_size: int
+) -> Iterator[List[Dict]]:
+    """Stream movies associated with a list of genre IDs in chunks."""
     if not genre_ids:
-        return []
+        return iter(())
     query = (
-        select(
-            film_work.c.id,
-            film_work.c.rating,
-            film_work.c.title,
-            film_work.c.description,
-            film_work.c.file,
-            film_work.c.modified,
-        )
+        _movies_query()
         .select_from(film_work.join(genre_film_work))
         .where(genre_film_work.c.genre_id.in_(genre_ids))
     )
+    return _stream_rows(query, chunk_size)
+
+
+def stream_movies_by_person(
+    person_ids: List[str], chunk_size: int
+) -> Iterator[List[Dict]]:
+    """Stream movies associated with a list of person IDs in chunks."""
+    if not person_ids:
+        return iter(())
+    query = (
+        _movies_query()
+        .select_from(film_work.join(person_film_work))
+        .where(person_film_work.c.person_id.in_(person_ids))
+    )
+    return _stream_rows(query, chunk_size)
+
+
+@backoff.on_exception(
+    backoff.expo,
+    OperationalError,
+    max_time=settings.backoff_max_time,
+)
+def extract_person_film_work(
+    batch_size: int,
+    last_created_person_film_work: datetime,
+    last_id: Optional[str],
+) -> List[Dict]:
+    """Extract a batch of person-to-film links created since the last run.
+
+    Links are paged by (created, id): many links share a creation time,
+    e.g. after a dump is loaded.
+    """
+    query = select(
+        person_film_work.c.id,
+        person_film_work.c.person_id,
+        person_film_work.c.film_work_id,
+        person_film_work.c.created,
+    )
+    if last_id:
+        query = query.where(
+            tuple_(person_film_work.c.created, person_film_work.c.id)
+            > tuple_(
+                literal(last_created_person_film_work, person_film_work.c.created.type),
+                literal(last_id, person_film_work.c.id.type),
+            )
+        )
+    else:
+        query = query.where(person_film_work.c.created > last_created_person_film_work)
+    query = query.order_by(person_film_work.c.created, person_film_work.c.id).limit(
+        batch_size
+    )
     try:
         result = session.execute(query)
         columns = result.keys()
@@ -214,29 +319,74 @@ def get_movies_by_genre(genre_ids: List[str]) -> List[Dict]:
         return []
 
 
-def get_movies_by_person(person_ids: List[str]) -> List[Dict]:
-    """Retrieve all movies associated with a list of person IDs."""
+def get_genres_by_ids(genre_ids: List[str]) -> List[Dict]:
+    """Retrieve genres by a list of IDs."""
+    if not genre_ids:
+        return []
+    query = select(genre.c.id, genre.c.name, genre.c.modified).where(
+        genre.c.id.in_(genre_ids)
+    )
+    try:
+        result = session.execute(query)
+        columns = result.keys()
+        return [dict(zip(columns, row)) for row in result]
+    except Exception as e:
+        # An empty result would skip reindexing the changed genres
+        logger.error(f"Failed to get genres by ids: {e}")
+        session.rollback()
+        raise
+
+
+def get_persons_by_ids(person_ids: List[str]) -> List[Dict]:
+    """Retrieve persons by a list of IDs."""
     if not person_ids:
         return []
+    query = select(person.c.id, person.c.full_name, person.c.modified).where(
+        person.c.id.in_(person_ids)
+    )
+    try:
+        result = session.execute(query)
+        columns = result.keys()
+        return [dict(zip(columns, row)) for row in result]
+    except Exception as e:
+        # An empty result would skip reindexing the changed persons
+        logger.error(f"Failed to get persons by ids: {e}")
+        session.rollback()
+        raise
+
+
+def get_films_by_persons(person_ids: List[str]) -> Dict[str, List[Dict]]:
+    """Retrieve films with the person's roles for a list of person IDs."""
+    if not person_ids:
+        return {}
     query = (
         select(
+            person_film_work.c.person_id,
             film_work.c.id,
-            film_work.c.rating,
             film_work.c.title,
-            film_work.c.description,
-            film_work.c.file,
-            film_work.c.modified,
+            film_work.c.rating,
+            person_film_work.c.role,
         )
         .select_from(film_work.join(person_film_work))
         .where(person_film_work.c.person_id.in_(person_ids))
+        .order_by(person_film_work.c.person_id, film_work.c.id)
     )
     try:
         result = session.execute(query)
-        columns = result.keys()
-        return [dict(zip(columns, row)) for row in result]
-    except DataError as e:
-        logger.error(f"DataError: {e}")
-        return []
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return []
+        # An empty result would index the persons without their films
+        logger.error(f"Failed to get films of persons: {e}")
+        session.rollback()
+        raise
+
+    films_by_person: Dict[str, Dict[str, Dict]] = {}
+    for person_id, film_id, title, rating, role in result:
+        films = films_by_person.setdefault(str(person_id), {})
+        film = films.setdefault(
+            str(film_id),
+            {"id": film_id, "title": title, "rating": rating, "roles": []},
+        )
+        film["roles"].append(role)
+    return {
+        person_id: list(films.values()) for person_id, films in films_by_person.items()
+    }
@@ -35,6 +35,11 @@ INDEX_BASE_SETTINGS = {
     },
 }
 
+# Подсказки при наборе (movie_api /api/v1/suggest): поле с n-граммами префиксов.
+# search_as_you_type не может быть подполем, поэтому это отдельное поле верхнего
+# уровня, которое заполняется из исходного через copy_to, и ETL его не пишет
+SUGGEST_FIELD = {"type": "search_as_you_type", "analyzer": "standard"}
+
 index_body = {
     **INDEX_BASE_SETTINGS,
     "mappings": {
@@ -56,7 +61,9 @@ index_body = {
                 "type": "text",
                 "analyzer": "ru_en",
                 "fields": {"raw": {"type": "keyword"}},
+                "copy_to": "title_suggest",
             },
+            "title_suggest": SUGGEST_FIELD,
             "description": {"type": "text", "analyzer": "ru_en"},
             "directors_names": {"type": "text", "analyzer": "ru_en"},
             "actors_names": {"type": "text", "analyzer": "ru_en"},
@@ -110,6 +117,19 @@ index_body_genres = {
     },
 }
 
+# Фильмы персоны хранятся прямо в её документе, чтобы movie_api получал
+# их одним get без nested-поиска по индексу movies
+PERSON_FILMS_MAPPING = {
+    "type": "object",
+    "dynamic": "strict",
+    "properties": {
+        "uuid": {"type": "keyword"},
+        "title": {"type": "text", "analyzer": "ru_en"},
+        "imdb_rating": {"type": "float"},
+        "roles": {"type": "keyword"},
+    },
+}
+
 index_body_persons = {
     **INDEX_BASE_SETTINGS,
     "mappings": {
@@ -122,13 +142,42 @@ index_body_persons = {
                 "type": "text",
                 "analyzer": "standard",
                 "fields": {"raw": {"type": "keyword"}},
+                "copy_to": "full_name_suggest",
             },
-            "modified": {
-                "modified": {"type": "date"},
-            },
+            "full_name_suggest": SUGGEST_FIELD,
+            "modified": {"type": "date"},
+            "films": PERSON_FILMS_MAPPING,
         },
     },
 }
 es.options(ignore_status=[400]).indices.create(index="movies", body=index_body)
 es.options(ignore_status=[400]).indices.create(index="genres", body=index_body_genres)
 es.options(ignore_status=[400]).indices.create(index="persons", body=index_body_persons)
+# Для уже существующего индекса persons добавляем поле films
+es.options(ignore_status=[400]).indices.put_mapping(
+    index="persons", properties={"films": PERSON_FILMS_MAPPING}
+)
+
+
+def add_suggest_field(index: str, field: str, properties: dict) -> None:
+    """Добавить в существующий индекс поле подсказок для field и заполнить его.
+
+    copy_to срабатывает только при индексации документа, поэтому после
+    изменения маппинга документы индекса переписываются на месте.
+    """
+    suggest_field = properties[field]["copy_to"]
+    current = es.indices.get_field_mapping(index=index, fields=suggest_field)
+    if current.get(index, {}).get("mappings"):
+        return
+    es.indices.put_mapping(
+        index=index,
+        properties={
+            suggest_field: properties[suggest_field],
+            field: properties[field],
+        },
+    )
+    es.update_by_query(index=index, conflicts="proceed", wait_for_completion=False)
+
+
+add_suggest_field("movies", "title", index_body["mappings"]["properties"])
+add_suggest_field("persons", "full_name", index_body_persons["mappings"]["properties"])
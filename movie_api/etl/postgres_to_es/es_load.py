@@ -1,10 +1,14 @@
-from typing import List
+from typing import Iterable, List, Tuple
 
 from config import settings
 from elasticsearch import Elasticsearch, helpers
 from logger import logger
+from utils import publish_invalidation
 
-# Elasticsearch client
+GENRES_INDEX = "genres"
+PERSONS_INDEX = "persons"
+
+# Elasticsearch client, shared by all loaders
 es = Elasticsearch(settings.elasticsearch_dsn)
 
 
@@ -12,69 +16,129 @@ def transform_person_data(person):
     return {"uuid": str(person["id"]), "full_name": person["name"]}
 
 
+def _bulk(index: str, actions: Iterable[dict]) -> Tuple[List[str], List[dict]]:
+    """Send actions in chunks, return ids of applied ones and item errors.
+
+    Chunks are limited by action count and by size in bytes. Actions
+    rejected with 429 (the cluster is overloaded) are resent with
+    exponential backoff, other item errors are collected.
+    """
+    applied, errors = [], []
+    for ok, item in helpers.streaming_bulk(
+        es,
+        actions,
+        chunk_size=settings.es_bulk_chunk_size,
+        max_chunk_bytes=settings.es_bulk_max_chunk_bytes,
+        raise_on_error=False,
+        max_retries=settings.es_bulk_max_retries,
+        initial_backoff=settings.es_bulk_initial_backoff,
+        max_backoff=settings.es_bulk_max_backoff,
+    ):
+        op_type, result = next(iter(item.items()))
+        # A document that is already gone counts as deleted
+        if ok or (op_type == "delete" and result.get("status") == 404):
+            applied.append(result["_id"])
+        else:
+            errors.append(result)
+    logger.info(f"Applied {len(applied)} bulk actions to {index}.")
+    for error in errors:
+        logger.error(f"Failed to update document {error.get('_id')}: {error}")
+    return applied, errors
+
+
+def _publish(index: str, entity: str, ids: List[str]) -> None:
+    """Make changes searchable, then publish their invalidation.
+
+    movie_api rebuilds evicted pages right away, so the index is refreshed
+    once per load instead of waiting for a refresh after every chunk.
+    """
+    if ids:
+        es.indices.refresh(index=index)
+    publish_invalidation(entity, ids)
+
+
+def bulk_index(index: str, documents: Iterable[dict]) -> Tuple[List[str], List[dict]]:
+    """Index documents, return ids of indexed ones and item errors."""
+    return _bulk(
+        index,
+        (
+            {"_index": index, "_id": document["uuid"], "_source": document}
+            for document in documents
+        ),
+    )
+
+
+def bulk_delete(index: str, ids: Iterable[str]) -> Tuple[List[str], List[dict]]:
+    """Delete documents, return ids of deleted ones and item errors."""
+    return _bulk(
+        index,
+        (
+            {"_op_type": "delete", "_index": index, "_id": str(document_id)}
+            for document_id in ids
+        ),
+    )
+
+
 def load_movies_to_elasticsearch(movies: List[dict]):
     """Load movies to Elasticsearch."""
     if not movies:
         logger.info("No movies to index.")
         return
 
-    actions = []
+    documents = []
     for movie in movies:
         movie_copy = movie.copy()
 
         # Преобразуем структуру directors, actors и writers
-        if "directors" in movie_copy:
-            movie_copy["directors"] = [
-                transform_person_data(director) for director in movie_copy["directors"]
-            ]
-        if "actors" in movie_copy:
-            movie_copy["actors"] = [
-                transform_person_data(actor) for actor in movie_copy["actors"]
-            ]
-        if "writers" in movie_copy:
-            movie_copy["writers"] = [
-                transform_person_data(writer) for writer in movie_copy["writers"]
-            ]
-
-        actions.append(
-            {
-                "_index": settings.elasticsearch_index,
-                "_id": movie["uuid"],
-                "_source": movie_copy,
-            }
-        )
-    try:
-        logger.info(
-            f"Indexing actions: {actions}"
-        )  # Логирование данных перед отправкой
-        success, failed = helpers.bulk(es, actions, stats_only=True)
-        logger.info(f"Successfully indexed {success} movies.")
-        if failed:
-            logger.error(f"{failed} movies failed to index.")
-    except helpers.BulkIndexError as e:
-        for error in e.errors:
-            logger.error(f"Failed to index document: {error}")
-        raise
-    except Exception as e:
-        logger.error(f"Failed to index movies in Elasticsearch: {e}")
-        raise
-
-
-def load_genres_to_elasticsearch(genres):
-    es_client = Elasticsearch(settings.elasticsearch_dsn)
-    for genre in genres:
-        try:
-            es_client.index(index="genres", id=genre["uuid"], document=genre)
-            logger.info(f"Genre {genre['uuid']} indexed successfully")
-        except Exception as e:
-            logger.error(f"Failed to index genre {genre['uuid']}: {e}")
-
-
-def load_persons_to_elasticsearch(persons):
-    es_client = Elasticsearch(settings.elasticsearch_dsn)
-    for person in persons:
-        try:
-            es_client.index(index="persons", id=person["uuid"], document=person)
-            logger.info(f"Person {person['uuid']} indexed successfully")
-        except Exception as e:
-            logger.error(f"Failed to index person {person['uuid']}: {e}")
+        for role_field in ("directors", "actors", "writers"):
+            if role_field in movie_copy:
+                movie_copy[role_field] = [
+                    transform_person_data(person) for person in movie_copy[role_field]
+                ]
+        documents.append(movie_copy)
+
+    indexed, errors = bulk_index(settings.elasticsearch_index, documents)
+    _publish(settings.elasticsearch_index, "film", indexed)
+    if errors:
+        # The run is retried, checkpoints must not move past lost movies
+        raise helpers.BulkIndexError(f"{len(errors)} movies failed to index.", errors)
+
+
+def load_genres_to_elasticsearch(genres: List[dict]):
+    """Load genres to Elasticsearch."""
+    indexed, errors = bulk_index(GENRES_INDEX, genres)
+    _publish(GENRES_INDEX, "genre", indexed)
+    if errors:
+        raise helpers.BulkIndexError(f"{len(errors)} genres failed to index.", errors)
+
+
+def load_persons_to_elasticsearch(persons: List[dict]):
+    """Load persons to Elasticsearch."""
+    indexed, errors = bulk_index(PERSONS_INDEX, persons)
+    _publish(PERSONS_INDEX, "person", indexed)
+    if errors:
+        raise helpers.BulkIndexError(f"{len(errors)} persons failed to index.", errors)
+
+
+def delete_movies_from_elasticsearch(movie_ids: Iterable[str]):
+    """Delete movies from Elasticsearch."""
+    deleted, errors = bulk_delete(settings.elasticsearch_index, movie_ids)
+    _publish(settings.elasticsearch_index, "film", deleted)
+    if errors:
+        raise helpers.BulkIndexError(f"{len(errors)} movies failed to delete.", errors)
+
+
+def delete_genres_from_elasticsearch(genre_ids: Iterable[str]):
+    """Delete genres from Elasticsearch."""
+    deleted, errors = bulk_delete(GENRES_INDEX, genre_ids)
+    _publish(GENRES_INDEX, "genre", deleted)
+    if errors:
+        raise helpers.BulkIndexError(f"{len(errors)} genres failed to delete.", errors)
+
+
+def delete_persons_from_elasticsearch(person_ids: Iterable[str]):
+    """Delete persons from Elasticsearch."""
+    deleted, errors = bulk_delete(PERSONS_INDEX, person_ids)
+    _publish(PERSONS_INDEX, "person", deleted)
+    if errors:
+        raise helpers.BulkIndexError(f"{len(errors)} persons failed to delete.", errors)
@@ -1,34 +1,130 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Iterator, Optional
 
 import backoff
 from apscheduler.schedulers.blocking import BlockingScheduler
+from cdc import ChangeSet, consume_changes
 from config import settings
 from database import (
     extract_genres,
     extract_movies,
+    extract_person_film_work,
     extract_persons,
-    get_movies_by_genre,
-    get_movies_by_person,
+    get_films_by_persons,
+    get_genres_by_ids,
+    get_persons_by_ids,
+    session,
+    stream_movies_by_genre,
+    stream_movies_by_ids,
+    stream_movies_by_person,
 )
 from es_load import (
+    delete_genres_from_elasticsearch,
+    delete_movies_from_elasticsearch,
+    delete_persons_from_elasticsearch,
     load_genres_to_elasticsearch,
     load_movies_to_elasticsearch,
     load_persons_to_elasticsearch,
 )
 from logger import logger
+from pipeline import Pipeline, Stage
+from prometheus_client import start_http_server
+from rankings import (
+    rebuild_film_rankings,
+    remove_film_rankings,
+    update_film_rankings,
+)
 from sqlalchemy.exc import OperationalError
-from transform import transform_genre, transform_movie, transform_person
+from transform import assemble_movies, enrich_movies, transform_genre, transform_person
 from utils import (
+    get_last_created_person_film_work,
     get_last_modified_genres,
     get_last_modified_movies,
     get_last_modified_persons,
+    get_last_person_film_work_id,
     get_last_processed_id,
+    set_last_created_person_film_work,
     set_last_modified_genres,
     set_last_modified_movies,
     set_last_modified_persons,
+    set_last_person_film_work_id,
     set_last_processed_id,
 )
 
+PERSON_ROLE_FIELDS = ("directors", "actors", "writers")
+
+assembly_pool: Optional[ProcessPoolExecutor] = None
+
+
+def load_persons_with_films(person_ids: set) -> None:
+    """Rebuild person documents together with their films and roles."""
+    person_ids = list(person_ids)
+    for start in range(0, len(person_ids), settings.batch_size):
+        chunk = person_ids[start : start + settings.batch_size]
+        films_by_person = get_films_by_persons(chunk)
+        persons = [
+            transform_person(person_row, films_by_person.get(str(person_row["id"])))
+            for person_row in get_persons_by_ids(chunk)
+        ]
+        load_persons_to_elasticsearch(persons)
+
+
+def start_assembly_pool() -> None:
+    """Start the document assembly processes if they are configured."""
+    global assembly_pool
+    if assembly_pool is None and settings.transform_processes > 0:
+        assembly_pool = ProcessPoolExecutor(settings.transform_processes)
+        # Fork the workers now, while no pipeline thread holds a lock
+        assembly_pool.submit(int).result()
+
+
+def transform_stage(movie_rows: list) -> Iterator[list]:
+    """Fetch relations of a chunk of movies and assemble their documents."""
+    relations = enrich_movies(movie_rows)
+    if assembly_pool is None:
+        yield assemble_movies(movie_rows, *relations)
+    else:
+        yield assembly_pool.submit(assemble_movies, movie_rows, *relations).result()
+
+
+def build_pipeline(affected_person_ids: set) -> Pipeline:
+    """Extract, transform and load movies concurrently.
+
+    Extraction takes callables returning chunks of movie rows, the load
+    stage collects persons whose documents have to be rebuilt.
+    """
+    start_assembly_pool()
+    lock = threading.Lock()
+
+    def load_stage(movies: list) -> Iterator[list]:
+        if not movies:
+            return
+        load_movies_to_elasticsearch(movies)
+        update_film_rankings(movies)
+        # Title and rating of a film are denormalized into its persons' documents
+        person_ids = {
+            str(person["id"])
+            for movie in movies
+            for role_field in PERSON_ROLE_FIELDS
+            for person in movie.get(role_field, [])
+        }
+        with lock:
+            affected_person_ids.update(person_ids)
+        yield movies
+
+    return Pipeline(
+        [
+            Stage("extract", lambda source: source(), settings.extract_workers),
+            Stage("transform", transform_stage, settings.transform_workers),
+            Stage("load", load_stage, settings.load_workers),
+        ],
+        queue_size=settings.pipeline_queue_size,
+        # Every stage thread gets its own session, close it when the thread ends
+        worker_teardown=session.remove,
+    )
+
 
 @backoff.on_exception(
     backoff.expo,
@@ -41,27 +137,61 @@ def etl_process():
     last_modified_movies = get_last_modified_movies()
     last_modified_genres = get_last_modified_genres()
     last_modified_persons = get_last_modified_persons()
+    last_created_person_film_work = get_last_created_person_film_work()
 
     logger.info(
         f"Starting ETL process with batch size {settings.batch_size}, last processed ID {last_id}, "
         f"and last modified movies timestamp {last_modified_movies}..."
     )
     try:
+        rebuild_film_rankings()
         movie_rows = extract_movies(settings.batch_size, last_id)
         updated_genres = extract_genres(last_modified_genres)
         updated_persons = extract_persons(last_modified_persons)
+        new_person_film_work = extract_person_film_work(
+            settings.batch_size,
+            last_created_person_film_work,
+            get_last_person_film_work_id(),
+        )
 
-        if not movie_rows and not updated_genres and not updated_persons:
+        if (
+            not movie_rows
+            and not updated_genres
+            and not updated_persons
+            and not new_person_film_work
+        ):
             logger.info("No data to process.")
             return
 
-        # Transform movies
-        movies = [transform_movie(movie_row) for movie_row in movie_rows]
+        # Персоны, чьи документы (вместе со списком фильмов) нужно пересобрать
+        affected_person_ids = {str(link["person_id"]) for link in new_person_film_work}
 
+        # Films of updated genres and persons may be numerous: they are
+        # streamed in chunks and transformed and loaded as they arrive
+        sources = []
         if movie_rows:
-            last_processed_id = movies[-1]["uuid"]
-            set_last_processed_id(last_processed_id)
-            # Update last modified timestamps
+            sources.append(lambda: iter([movie_rows]))
+        if updated_genres:
+            genre_ids = [genre["id"] for genre in updated_genres]
+            sources.append(
+                lambda: stream_movies_by_genre(genre_ids, settings.batch_size)
+            )
+            # Transform and load genres
+            genres = [transform_genre(genre_row) for genre_row in updated_genres]
+            load_genres_to_elasticsearch(genres)
+        if updated_persons:
+            affected_person_ids.update(str(person["id"]) for person in updated_persons)
+            person_ids = [person["id"] for person in updated_persons]
+            sources.append(
+                lambda: stream_movies_by_person(person_ids, settings.batch_size)
+            )
+
+        build_pipeline(affected_person_ids).run(sources)
+        load_persons_with_films(affected_person_ids)
+
+        # Checkpoints move only after everything they cover has been loaded
+        if movie_rows:
+            set_last_processed_id(str(movie_rows[-1]["id"]))
             latest_timestamp_movies = max(
                 [
                     datetime.fromisoformat(movie["modified"].isoformat())
@@ -69,54 +199,67 @@ def etl_process():
                 ]
             )
             set_last_modified_movies(latest_timestamp_movies)
-
         if updated_genres:
-            # Transform genres
-            genres = [transform_genre(genre_row) for genre_row in updated_genres]
-            # Load genres to Elasticsearch
-            load_genres_to_elasticsearch(genres)
-            # Update last modified timestamp for genres
-            latest_timestamp_genres = max(genre["modified"] for genre in updated_genres)
-            set_last_modified_genres(latest_timestamp_genres)
-            # Get and transform movies by updated genres
-            genre_ids = [genre["id"] for genre in updated_genres]
-            genre_movie_rows = get_movies_by_genre(genre_ids)
-            genre_movies = [
-                transform_movie(movie_row) for movie_row in genre_movie_rows
-            ]
-            movies.extend(genre_movies)
-
+            set_last_modified_genres(max(genre["modified"] for genre in updated_genres))
         if updated_persons:
-            # Transform persons
-            persons = [transform_person(person_row) for person_row in updated_persons]
-            # Load persons to Elasticsearch
-            load_persons_to_elasticsearch(persons)
-            # Update last modified timestamp for persons
-            latest_timestamp_persons = max(
-                [person["modified"] for person in updated_persons]
+            set_last_modified_persons(
+                max(person["modified"] for person in updated_persons)
             )
-            set_last_modified_persons(latest_timestamp_persons)
-
-            person_ids = [person["id"] for person in updated_persons]
-            person_movie_rows = get_movies_by_person(person_ids)
-            person_movies = [
-                transform_movie(movie_row) for movie_row in person_movie_rows
-            ]
-            movies.extend(person_movies)
-
-        # Load movies to Elasticsearch
-        load_movies_to_elasticsearch(movies)
+        if new_person_film_work:
+            # Links are ordered by (created, id), the last one is the position
+            set_last_created_person_film_work(new_person_film_work[-1]["created"])
+            set_last_person_film_work_id(str(new_person_film_work[-1]["id"]))
 
     except Exception as e:
         logger.error(f"ETL process failed: {e}")
         raise
 
 
+def apply_changes(changes: ChangeSet) -> None:
+    """Reindex documents touched by a batch of replicated changes."""
+    movie_ids = list(changes.movies - changes.deleted_movies)
+    genre_ids = list(changes.genres - changes.deleted_genres)
+    person_ids = list(changes.persons - changes.deleted_persons)
+    affected_person_ids = (changes.persons | changes.linked_persons) - (
+        changes.deleted_persons
+    )
+
+    if changes.deleted_movies:
+        delete_movies_from_elasticsearch(changes.deleted_movies)
+        remove_film_rankings(changes.deleted_movies)
+    if changes.deleted_genres:
+        delete_genres_from_elasticsearch(changes.deleted_genres)
+    if changes.deleted_persons:
+        delete_persons_from_elasticsearch(changes.deleted_persons)
+    if genre_ids:
+        load_genres_to_elasticsearch(
+            [transform_genre(genre_row) for genre_row in get_genres_by_ids(genre_ids)]
+        )
+
+    sources = []
+    if movie_ids:
+        sources.append(lambda: stream_movies_by_ids(movie_ids, settings.batch_size))
+    if genre_ids:
+        sources.append(lambda: stream_movies_by_genre(genre_ids, settings.batch_size))
+    if person_ids:
+        sources.append(lambda: stream_movies_by_person(person_ids, settings.batch_size))
+    build_pipeline(affected_person_ids).run(sources)
+    load_persons_with_films(affected_person_ids)
+
+
 if __name__ == "__main__":
-    scheduler = BlockingScheduler()
-    scheduler.add_job(etl_process, "interval", minutes=settings.etl_interval_minutes)
-    try:
-        logger.info("Starting scheduler...")
-        scheduler.start()
-    except (KeyboardInterrupt, SystemExit):
-        pass
+    if settings.metrics_port:
+        start_http_server(settings.metrics_port)
+    if settings.etl_mode == "cdc":
+        rebuild_film_rankings()
+        consume_changes(apply_changes)
+    else:
+        scheduler = BlockingScheduler()
+        scheduler.add_job(
+            etl_process, "interval", minutes=settings.etl_interval_minutes
+        )
+        try:
+            logger.info("Starting scheduler...")
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
@@ -0,0 +1,180 @@
+import threading
+import time
+from dataclasses import dataclass
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sized
+
+from logger import logger
+from prometheus_client import Counter, Gauge, Histogram
+
+stage_batches_total = Counter(
+    "etl_stage_batches_total", "Batches processed by an ETL stage", ["stage"]
+)
+stage_documents_total = Counter(
+    "etl_stage_documents_total", "Documents emitted by an ETL stage", ["stage"]
+)
+stage_duration_seconds = Histogram(
+    "etl_stage_duration_seconds", "Time an ETL stage spends on one batch", ["stage"]
+)
+stage_queue_depth = Gauge(
+    "etl_stage_queue_depth", "Batches waiting in the input queue of a stage", ["stage"]
+)
+
+# How often blocked workers check whether the pipeline has failed
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+_EXHAUSTED = object()
+
+
+@dataclass
+class Stage:
+    """A pipeline stage run by `workers` threads.
+
+    `func` takes one item of the previous stage and returns an iterable of
+    items for the next one. Results are consumed lazily, so a stage may
+    split an item into many (extraction) without holding them all.
+    """
+
+    name: str
+    func: Callable[[Any], Iterable[Any]]
+    workers: int = 1
+
+
+class Pipeline:
+    """Run stages concurrently, connected by bounded queues.
+
+    A full queue blocks the stage feeding it, so a slow stage throttles
+    the ones before it instead of letting batches pile up in memory.
+    The first error stops every stage and is re-raised by `run`.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        queue_size: int,
+        worker_teardown: Optional[Callable[[], None]] = None,
+    ):
+        self.stages = stages
+        self.queues = [Queue(maxsize=queue_size) for _ in stages]
+        self.worker_teardown = worker_teardown
+        self._failed = threading.Event()
+        self._errors: List[Exception] = []
+        self._lock = threading.Lock()
+        self._running: List[int] = []
+        self._documents: Dict[str, int] = {}
+        self._busy: Dict[str, float] = {}
+
+    def run(self, items: Iterable[Any]) -> None:
+        """Feed items to the first stage and wait until all stages drain."""
+        self._failed.clear()
+        self._errors.clear()
+        self._running = [stage.workers for stage in self.stages]
+        self._documents = {stage.name: 0 for stage in self.stages}
+        self._busy = {stage.name: 0.0 for stage in self.stages}
+
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(index,),
+                name=f"etl-{stage.name}-{number}",
+                daemon=True,
+            )
+            for index, stage in enumerate(self.stages)
+            for number in range(stage.workers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for item in items:
+            if not self._put(0, item):
+                break
+        self._put(0, _DONE)
+        for thread in threads:
+            thread.join()
+        self._log_stats(time.perf_counter() - started)
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _put(self, index: int, item: Any) -> bool:
+        """Pass an item to stage `index`; False if the pipeline has failed."""
+        if index == len(self.stages):
+            return True
+        queue = self.queues[index]
+        while not self._failed.is_set():
+            try:
+                queue.put(item, timeout=POLL_INTERVAL)
+            except Full:
+                continue
+            stage_queue_depth.labels(self.stages[index].name).set(queue.qsize())
+            return True
+        return False
+
+    def _work(self, index: int) -> None:
+        try:
+            self._consume(index)
+        finally:
+            if self.worker_teardown:
+                self.worker_teardown()
+
+    def _consume(self, index: int) -> None:
+        stage, queue = self.stages[index], self.queues[index]
+        while not self._failed.is_set():
+            try:
+                item = queue.get(timeout=POLL_INTERVAL)
+            except Empty:
+                continue
+            stage_queue_depth.labels(stage.name).set(queue.qsize())
+
+            if item is _DONE:
+                # Leave the marker for the other workers of this stage,
+                # the last one to finish passes it downstream
+                queue.put(_DONE)
+                with self._lock:
+                    self._running[index] -= 1
+                    last = self._running[index] == 0
+                if last:
+                    self._put(index + 1, _DONE)
+                return
+
+            if not self._process(index, stage, item):
+                return
+
+    def _process(self, index: int, stage: Stage, item: Any) -> bool:
+        # Time spent blocked on the next queue is not counted as busy time
+        busy, documents = 0.0, 0
+        try:
+            results = iter(stage.func(item))
+            while True:
+                started = time.perf_counter()
+                result = next(results, _EXHAUSTED)
+                busy += time.perf_counter() - started
+                if result is _EXHAUSTED:
+                    break
+                documents += len(result) if isinstance(result, Sized) else 1
+                if not self._put(index + 1, result):
+                    return False
+        except Exception as e:
+            logger.error(f"ETL stage {stage.name} failed: {e}")
+            with self._lock:
+                self._errors.append(e)
+            self._failed.set()
+            return False
+        finally:
+            stage_batches_total.labels(stage.name).inc()
+            stage_documents_total.labels(stage.name).inc(documents)
+            stage_duration_seconds.labels(stage.name).observe(busy)
+            with self._lock:
+                self._documents[stage.name] += documents
+                self._busy[stage.name] += busy
+        return True
+
+    def _log_stats(self, elapsed: float) -> None:
+        for stage in self.stages:
+            documents = self._documents[stage.name]
+            logger.info(
+                f"Stage {stage.name}: {documents} documents, "
+                f"{self._busy[stage.name]:.2f}s busy, "
+                f"{documents / elapsed if elapsed else 0:.0f} docs/sec"
+            )
@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List
+
+from config import settings
+from elasticsearch import helpers
+from es_load import es
+from logger import logger
+from utils import publish_invalidation, redis_client
+
+# Sorted sets "film uuid -> imdb_rating" read by movie_api for GET /films/
+RANKING_ALL_KEY = "films:rating:all"
+RANKING_GENRE_KEY = "films:rating:genre:{}"
+# Genres a film is currently ranked in, to drop it from genres it has left
+FILM_GENRES_KEY = "films:genres:{}"
+# Set once the rankings cover every film already indexed in Elasticsearch
+RANKINGS_READY_KEY = "films:rating:ready"
+
+# Invalidation entity of cached ranking pages: "all" or a genre id
+RANKING_ENTITY = "ranking"
+RANKING_ALL = "all"
+
+# Score of films without a rating: they rank below every rated film
+UNRATED_SCORE = -1
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def update_film_rankings(movies: Iterable[Dict]) -> None:
+    """Update global and per-genre rating rankings for the given movies.
+
+    Rankings whose order or members changed are published, so that
+    movie_api drops the cached pages built from them.
+    """
+    movies = {movie["uuid"]: movie for movie in movies}
+    if not movies:
+        return
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for movie_id in movies:
+            pipe.smembers(FILM_GENRES_KEY.format(movie_id))
+            pipe.zscore(RANKING_ALL_KEY, movie_id)
+        replies = pipe.execute()
+
+    changed = set()
+    with redis_client.pipeline(transaction=True) as pipe:
+        for (movie_id, movie), previous, previous_score in zip(
+            movies.items(), replies[::2], replies[1::2]
+        ):
+            rating = movie.get("imdb_rating")
+            score = UNRATED_SCORE if rating is None else rating
+            genres = {genre["uuid"] for genre in movie.get("genre") or []}
+            previous = {genre.decode("utf-8") for genre in previous}
+            for genre_id in previous - genres:
+                pipe.zrem(RANKING_GENRE_KEY.format(genre_id), movie_id)
+            pipe.zadd(RANKING_ALL_KEY, {movie_id: score})
+            for genre_id in genres:
+                pipe.zadd(RANKING_GENRE_KEY.format(genre_id), {movie_id: score})
+            pipe.delete(FILM_GENRES_KEY.format(movie_id))
+            if genres:
+                pipe.sadd(FILM_GENRES_KEY.format(movie_id), *genres)
+
+            if previous_score is None or previous_score != score:
+                changed |= {RANKING_ALL} | previous | genres
+            else:
+                changed |= previous ^ genres
+        pipe.execute()
+    publish_invalidation(RANKING_ENTITY, changed)
+
+
+def remove_film_rankings(movie_ids: Iterable[str]) -> None:
+    """Drop deleted movies from the global and per-genre rankings."""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return
+
+    with redis_client.pipeline(transaction=False) as pipe:
+        for movie_id in movie_ids:
+            pipe.smembers(FILM_GENRES_KEY.format(movie_id))
+        previous_genres = pipe.execute()
+
+    changed = {RANKING_ALL}
+    with redis_client.pipeline(transaction=True) as pipe:
+        for movie_id, previous in zip(movie_ids, previous_genres):
+            for genre in previous:
+                genre_id = genre.decode("utf-8")
+                pipe.zrem(RANKING_GENRE_KEY.format(genre_id), movie_id)
+                changed.add(genre_id)
+            pipe.zrem(RANKING_ALL_KEY, movie_id)
+            pipe.delete(FILM_GENRES_KEY.format(movie_id))
+        pipe.execute()
+    publish_invalidation(RANKING_ENTITY, changed)
+
+
+def rebuild_film_rankings() -> None:
+    """Build the rankings from Elasticsearch if they have never been built.
+
+    Movies indexed before the rankings existed are not extracted again,
+    so the initial state is taken from the index itself.
+    """
+    if redis_client.exists(RANKINGS_READY_KEY):
+        return
+    logger.info("Building film rankings from Elasticsearch...")
+    chunk: List[Dict] = []
+    total = 0
+    for hit in helpers.scan(
+        es,
+        index=settings.elasticsearch_index,
+        _source=["uuid", "imdb_rating", "genre.uuid"],
+        size=REBUILD_CHUNK_SIZE,
+    ):
+        chunk.append(hit["_source"])
+        if len(chunk) >= REBUILD_CHUNK_SIZE:
+            update_film_rankings(chunk)
+            total += len(chunk)
+            chunk = []
+    update_film_rankings(chunk)
+    total += len(chunk)
+    redis_client.set(RANKINGS_READY_KEY, "1")
+    logger.info(f"Film rankings built for {total} movies.")
@@ -0,0 +1,97 @@
+"""Throughput of movie enrichment: per-movie queries vs two set-based queries.
+
+The per-movie variant reproduces the previous transform: seven queries per
+movie (genres, then names and persons for every role). The batched variant
+is transform_movies, which fetches genres and persons for the whole batch
+with `film_work_id = ANY(:ids)` and json_agg.
+Run (from movie_api/etl/postgres_to_es, POSTGRES_DSN pointing to a database
+seeded from schema_design/dump_db.sql):
+    python scripts/bench_transform.py --batch-size 100 --batches 20
+"""
+
+import argparse
+import time
+
+from database import (
+    extract_movies,
+    genre,
+    genre_film_work,
+    person,
+    person_film_work,
+    session,
+)
+from sqlalchemy import select
+from transform import _build_movie, transform_movies
+
+ROLES = ("director", "actor", "writer")
+
+
+def transform_movies_per_row(movie_rows: list[dict]) -> list[dict]:
+    movies = []
+    for movie_row in movie_rows:
+        movie_id = str(movie_row["id"])
+        genres = [
+            {"name": name, "uuid": str(genre_id)}
+            for name, genre_id in session.execute(
+                select(genre.c.name, genre.c.id)
+                .select_from(genre.join(genre_film_work))
+                .where(genre_film_work.c.film_work_id == movie_id)
+            )
+        ]
+        persons_by_role = {}
+        for role in ROLES:
+            query = (
+                select(person.c.id, person.c.full_name)
+                .select_from(person.join(person_film_work))
+                .where(person_film_work.c.film_work_id == movie_id)
+                .where(person_film_work.c.role == role)
+            )
+            # The old transform queried names and persons separately
+            session.execute(query.with_only_columns(person.c.full_name)).fetchall()
+            persons_by_role[role] = [
+                {"id": str(person_id), "name": name}
+                for person_id, name in session.execute(query)
+            ]
+        movies.append(_build_movie(movie_row, genres, persons_by_role))
+    return movies
+
+
+def load_batches(batch_size: int, batches: int) -> list[list[dict]]:
+    result, last_id = [], None
+    for _ in range(batches):
+        rows = extract_movies(batch_size, last_id)
+        if not rows:
+            break
+        result.append(rows)
+        last_id = str(rows[-1]["id"])
+    return result
+
+
+def measure(transform, batches: list[list[dict]]) -> tuple[int, float]:
+    documents = 0
+    started = time.perf_counter()
+    for rows in batches:
+        documents += len(transform(rows))
+    return documents, time.perf_counter() - started
+
+
+def main(batch_size: int, batches: int):
+    movie_batches = load_batches(batch_size, batches)
+    variants = {
+        "per_movie": transform_movies_per_row,
+        "batched": transform_movies,
+    }
+    print(f"{'variant':<10} {'docs':>7} {'seconds':>8} {'docs/sec':>9}")
+    for name, transform in variants.items():
+        # Warm up query plans and the Postgres buffer cache
+        transform(movie_batches[0])
+        documents, elapsed = measure(transform, movie_batches)
+        print(f"{name:<10} {documents:>7} {elapsed:>8.2f} {documents / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=100, help="Movies per batch")
+    parser.add_argument("--batches", type=int, default=20, help="Batches to transform")
+    args = parser.parse_args()
+    main(args.batch_size, args.batches)
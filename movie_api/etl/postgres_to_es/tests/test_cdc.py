@@ -0,0 +1,106 @@
+from unittest.mock import Mock
+
+import cdc
+import pytest
+from cdc import ChangeSet, PgOutputDecoder, apply_with_retry
+
+FILM_ID = "3d825f60-9fff-4dfe-b294-1a45fa1e115d"
+OLD_FILM_ID = "2a090dde-f688-46fe-a9f4-b781a985275e"
+PERSON_ID = "a5a8f573-3cee-4ccc-8a2b-91cb9f55250a"
+LINK_ID = "0031feab-8f53-412a-8f53-47098a60ac73"
+
+# pgoutput (proto_version 1) messages as read from the slot.
+# Relation content.film_work (OID 16390, default replica identity):
+# id uuid (key), title text, rating float8
+FILM_WORK_RELATION = bytes.fromhex(
+    "5200004006636f6e74656e740066696c6d5f776f726b00640003016964000000"
+    "0b86ffffffff007469746c650000000019ffffffff00726174696e6700000002"
+    "bdffffffff"
+)
+# Relation content.person_film_work (OID 16412, replica identity full)
+PERSON_FILM_WORK_RELATION = bytes.fromhex(
+    "520000401c636f6e74656e7400706572736f6e5f66696c6d5f776f726b006600"
+    "040169640000000b86ffffffff0166696c6d5f776f726b5f69640000000b86ff"
+    "ffffff01706572736f6e5f69640000000b86ffffffff01726f6c650000000019"
+    "ffffffff"
+)
+# INSERT INTO film_work VALUES (FILM_ID, 'Star Wars', NULL)
+FILM_WORK_INSERT = bytes.fromhex(
+    "49000040064e0003740000002433643832356636302d396666662d346466652d"
+    "623239342d31613435666131653131356474000000095374617220576172736e"
+)
+# UPDATE film_work SET id = FILM_ID, rating = 8.6 WHERE id = OLD_FILM_ID:
+# the old key comes first, non-key columns of it are NULL
+FILM_WORK_UPDATE_KEY = bytes.fromhex(
+    "55000040064b0003740000002432613039306464652d663638382d343666652d"
+    "613966342d6237383161393835323735656e6e4e000374000000243364383235"
+    "6636302d396666662d346466652d623239342d31613435666131653131356474"
+    "000000095374617220576172737400000003382e36"
+)
+# DELETE FROM person_film_work WHERE id = LINK_ID: the whole old row
+PERSON_FILM_WORK_DELETE = bytes.fromhex(
+    "440000401c4f0004740000002430303331666561622d386635332d343132612d"
+    "386635332d343730393861363061633733740000002433643832356636302d39"
+    "6666662d346466652d623239342d316134356661316531313564740000002461"
+    "356138663537332d336365652d346363632d386132622d393163623966353532"
+    "35306174000000056163746f72"
+)
+# BEGIN: final LSN, commit time, xid
+BEGIN = bytes.fromhex("4200000000016b3e2800029a1c2b3c4d5e000002e6")
+
+
+@pytest.fixture
+def decoder():
+    decoder = PgOutputDecoder()
+    assert decoder.decode(FILM_WORK_RELATION) is None
+    assert decoder.decode(PERSON_FILM_WORK_RELATION) is None
+    return decoder
+
+
+def test_decode_insert(decoder):
+    assert decoder.decode(FILM_WORK_INSERT) == (
+        "film_work",
+        "I",
+        {"id": FILM_ID, "title": "Star Wars", "rating": None},
+    )
+
+
+def test_decode_update_with_old_key(decoder):
+    table, action, row = decoder.decode(FILM_WORK_UPDATE_KEY)
+    assert (table, action) == ("film_work", "U")
+    assert row == {"id": FILM_ID, "title": "Star Wars", "rating": "8.6"}
+
+
+def test_decode_delete_with_full_identity(decoder):
+    table, action, row = decoder.decode(PERSON_FILM_WORK_DELETE)
+    assert (table, action) == ("person_film_work", "D")
+    assert row == {
+        "id": LINK_ID,
+        "film_work_id": FILM_ID,
+        "person_id": PERSON_ID,
+        "role": "actor",
+    }
+
+    changes = ChangeSet()
+    changes.add(table, action, row)
+    assert changes.movies == {FILM_ID}
+    assert changes.linked_persons == {PERSON_ID}
+
+
+def test_decode_skips_other_messages(decoder):
+    assert decoder.decode(BEGIN) is None
+
+
+def test_apply_with_retry_keeps_batch(monkeypatch):
+    monkeypatch.setattr(cdc.time, "sleep", Mock())
+    changes = ChangeSet()
+    changes.add("film_work", "I", {"id": FILM_ID})
+    apply = Mock(side_effect=[ConnectionError, ConnectionError, None])
+    cursor = Mock()
+
+    apply_with_retry(apply, changes, cursor)
+
+    assert apply.call_count == 3
+    assert all(call.args == (changes,) for call in apply.call_args_list)
+    # Only keepalives between the attempts, the position is not confirmed
+    assert all(not call.kwargs for call in cursor.send_feedback.call_args_list)
@@ -1,51 +1,71 @@
 import logging
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
-from database import get_genres, get_names, get_persons
+from database import get_genres_by_movies, get_persons_by_movies
 from models import Movie
 
 logger = logging.getLogger(__name__)
 
 
+def transform_movies(movie_rows: List[Dict]) -> List[Dict]:
+    """Transform a batch of database rows to dictionaries for Elasticsearch.
+
+    Genres and persons of the whole batch are fetched with two set-based
+    queries and joined to the movies in memory.
+    """
+    return assemble_movies(movie_rows, *enrich_movies(movie_rows))
+
+
+def enrich_movies(movie_rows: List[Dict]) -> Tuple[Dict, Dict]:
+    """Fetch genres and persons of a batch of movies, keyed by movie ID."""
+    if not movie_rows:
+        return {}, {}
+    movie_ids = [str(movie_row["id"]) for movie_row in movie_rows]
+    return get_genres_by_movies(movie_ids), get_persons_by_movies(movie_ids)
+
+
+def assemble_movies(
+    movie_rows: List[Dict], genres_by_movie: Dict, persons_by_movie: Dict
+) -> List[Dict]:
+    """Build Elasticsearch documents from movie rows and their relations.
+
+    Does not touch the database, so it can run in a worker process.
+    """
+    return [
+        _build_movie(
+            movie_row,
+            genres_by_movie.get(str(movie_row["id"]), []),
+            persons_by_movie.get(str(movie_row["id"]), {}),
+        )
+        for movie_row in movie_rows
+    ]
+
+
 def transform_movie(movie_row: Dict) -> Dict:
     """Transform a database row to a dictionary for Elasticsearch."""
-    movie_id = str(movie_row["id"])
-    description = movie_row.get("description", "") or ""
+    return transform_movies([movie_row])[0]
+
+
+def _build_movie(
+    movie_row: Dict, genres: List[Dict], persons_by_role: Dict[str, List[Dict]]
+) -> Dict:
     imdb_rating = movie_row.get("rating")
-    file = movie_row.get("file", "") or ""
-    creation_date = movie_row.get("creation_date") or ""
-
-    if not description:
-        description = ""
-    if not file:
-        file = ""
-    if not creation_date:
-        creation_date = ""
-
-    try:
-        genres = get_genres(movie_id)
-        directors_names = get_names(movie_id, "director")
-        actors_names = get_names(movie_id, "actor")
-        writers_names = get_names(movie_id, "writer")
-        directors = get_persons(movie_id, "director")
-        actors = get_persons(movie_id, "actor")
-        writers = get_persons(movie_id, "writer")
-    except Exception as e:
-        logger.error(f"Error retrieving genres for movie ID: {movie_id}: {e}")
-        genres = directors_names = actors_names = writers_names = []
-        directors = actors = writers = []
+    creation_date = movie_row.get("creation_date")
+    directors = persons_by_role.get("director", [])
+    actors = persons_by_role.get("actor", [])
+    writers = persons_by_role.get("writer", [])
 
     movie = Movie(
-        uuid=movie_id,
-        imdb_rating=imdb_rating if imdb_rating is not None else None,
+        uuid=str(movie_row["id"]),
+        imdb_rating=imdb_rating,
         genre=genres,
         title=movie_row["title"],
-        description=description,
-        file=file,
+        description=movie_row.get("description") or "",
+        file=movie_row.get("file") or "",
         creation_date=creation_date if creation_date else None,
-        directors_names=directors_names,
-        actors_names=actors_names,
-        writers_names=writers_names,
+        directors_names=[person["name"] for person in directors],
+        actors_names=[person["name"] for person in actors],
+        writers_names=[person["name"] for person in writers],
         directors=directors,
         actors=actors,
         writers=writers,
@@ -60,9 +80,23 @@ def transform_genre(genre_row):
     }
 
 
-def transform_person(person_row):
+# Названия ролей в том виде, в котором их отдаёт movie_api
+PERSON_ROLES = {"actor": "actors", "writer": "writer", "director": "director"}
+
+
+def transform_person(person_row, films: Optional[List[Dict]] = None):
+    """Build a person document with the person's films and roles in them."""
     return {
         "uuid": str(person_row["id"]),
         "full_name": person_row["full_name"],
         "modified": person_row["modified"],
+        "films": [
+            {
+                "uuid": str(film["id"]),
+                "title": film["title"],
+                "imdb_rating": film["rating"],
+                "roles": [PERSON_ROLES.get(role, role) for role in film["roles"]],
+            }
+            for film in films or []
+        ],
     }
@@ -1,5 +1,6 @@
+import json
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
 from config import settings
 from redis import Redis
@@ -61,3 +62,42 @@ def get_last_modified_persons() -> datetime:
 def set_last_modified_persons(last_modified: datetime):
     """Store the last modified timestamp of persons in Redis."""
     redis_client.set("last_modified_persons", last_modified.isoformat())
+
+
+def get_last_created_person_film_work() -> datetime:
+    """Retrieve the creation timestamp of the last processed person-film link."""
+    last_created = redis_client.get("last_created_person_film_work")
+    return (
+        datetime.fromisoformat(last_created.decode("utf-8"))
+        if last_created
+        else datetime.min
+    )
+
+
+def set_last_created_person_film_work(last_created: datetime):
+    """Store the creation timestamp of the last processed person-film link."""
+    redis_client.set("last_created_person_film_work", last_created.isoformat())
+
+
+def get_last_person_film_work_id() -> Optional[str]:
+    """Retrieve the ID of the last processed person-film link from Redis."""
+    last_id = redis_client.get("last_person_film_work_id")
+    return last_id.decode("utf-8") if last_id else None
+
+
+def set_last_person_film_work_id(link_id: str):
+    """Store the ID of the last processed person-film link in Redis."""
+    redis_client.set("last_person_film_work_id", str(link_id))
+
+
+def publish_invalidation(entity: str, ids: Iterable[str]):
+    """Publish ids of changed documents so that movie_api drops their cache."""
+    ids = sorted({str(entity_id) for entity_id in ids})
+    if not ids:
+        return
+    redis_client.xadd(
+        settings.cache_invalidation_stream,
+        {"entity": entity, "ids": json.dumps(ids)},
+        maxlen=settings.cache_invalidation_maxlen,
+        approximate=True,
+    )
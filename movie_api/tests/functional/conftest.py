@@ -50,3 +50,12 @@ def make_get_request(session):
         return response
 
     return inner
+
+
+@pytest.fixture()
+def make_post_request(session):
+    async def inner(url, json_data=None):
+        response = await session.post(url, json=json_data)
+        return response
+
+    return inner
@@ -37,6 +37,23 @@ async def test_get_film_by_id(make_get_request, es_write_data, test_film):
     assert response_json["title"] == test_film["title"]
 
 
+@pytest.mark.parametrize("test_film", [film_data["test_film"]])
+@pytest.mark.asyncio
+async def test_get_film_not_modified(session, test_film):
+    """Повторный запрос фильма с его ETag получает 304 без тела."""
+    url = f"{test_settings.service_url}{api_url.films_url}{test_film['uuid']}"
+
+    response = await session.get(url)
+    assert response.status == HTTPStatus.OK
+    etag = response.headers["ETag"]
+    assert "max-age=" in response.headers["Cache-Control"]
+
+    response = await session.get(url, headers={"If-None-Match": etag})
+    assert response.status == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert await response.read() == b""
+
+
 @pytest.mark.parametrize(
     "invalid_id", ["not-a-valid-uuid", "12345678", "invalid-uuid-format"]
 )
@@ -183,3 +200,41 @@ async def test_redis_caching(make_get_request, es_write_data):
         "Кеширование данных не работает: "
         "второй запрос выполняется дольше или так же долго, как первый."
     )
+
+
+@pytest.mark.asyncio
+async def test_get_films_batch(make_post_request, es_write_data):
+    """Тест получения нескольких фильмов по списку ID одним запросом."""
+
+    test_films = film_data["test_films"]
+
+    await es_write_data(
+        data=[
+            {"_index": es_index.es_index_films, "_id": film["uuid"], "_source": film}
+            for film in test_films
+        ],
+        es_index=es_index.es_index_films,
+        es_index_mapping=es_index.es_movies_mapping,
+    )
+
+    # Несуществующий фильм пропускается, порядок ответа совпадает с порядком запроса
+    requested_uuids = [film["uuid"] for film in reversed(test_films)]
+    response = await make_post_request(
+        url=f"{test_settings.service_url}{api_url.films_url}batch",
+        json_data={"uuids": requested_uuids + ["not-a-valid-uuid"]},
+    )
+
+    assert response.status == HTTPStatus.OK
+    response_json = await response.json()
+    assert [film["uuid"] for film in response_json] == requested_uuids
+
+
+@pytest.mark.asyncio
+async def test_get_films_batch_empty(make_post_request):
+    """Тест запроса нескольких фильмов с пустым списком ID."""
+    response = await make_post_request(
+        url=f"{test_settings.service_url}{api_url.films_url}batch",
+        json_data={"uuids": []},
+    )
+
+    assert response.status == HTTPStatus.BAD_REQUEST
@@ -220,6 +220,24 @@ async def test_search_contents(
     assert body == expected_answer["items"]
 
 
+@pytest.mark.parametrize(
+    "prefix, group, expected_uuid",
+    [
+        ("sma", "films", films.search_film_1["uuid"]),
+        ("Smashed po", "films", films.search_film_1["uuid"]),
+        ("john f", "persons", person.search_person_0["uuid"]),
+    ],
+)
+@pytest.mark.asyncio
+async def test_suggest(make_get_request, prefix: str, group: str, expected_uuid: str):
+    url = test_settings.service_url + api_url.api_v1_prefix + "suggest"
+    response = await make_get_request(url=url, query_data={"prefix": prefix})
+    body = await response.json()
+    assert response.status == HTTPStatus.OK
+    assert set(body) == {"films", "persons"}
+    assert expected_uuid in [item["uuid"] for item in body[group]]
+
+
 @pytest.mark.parametrize(
     "endpoint, query_data, expected_answer",
     [
@@ -361,3 +379,60 @@ async def test_search_person_redis_caching(
     status = response.status
     assert status == expected_answer["status"]
     assert len(body) == expected_answer["length"]
+
+
+@pytest.mark.parametrize(
+    "endpoint, query",
+    [
+        ("films/", "Star"),
+        ("persons/", "John"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_search_by_cursor(make_get_request, endpoint, query):
+    url = test_settings.service_url + api_url.api_v1_prefix + endpoint + "search"
+
+    first_page = await make_get_request(
+        url=url, query_data={"query": query, "page_size": 10}
+    )
+    expected = [item["uuid"] for item in await first_page.json()]
+
+    items, cursor = [], ""
+    while cursor is not None:
+        response = await make_get_request(
+            url=url, query_data={"query": query, "page_size": 1, "cursor": cursor}
+        )
+        assert response.status == HTTPStatus.OK
+        items.extend(item["uuid"] for item in await response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+    assert sorted(items) == sorted(expected)
+
+
+@pytest.mark.asyncio
+async def test_search_invalid_cursor(make_get_request):
+    url = test_settings.service_url + api_url.api_v1_prefix + "films/search"
+    response = await make_get_request(
+        url=url, query_data={"query": "Star", "cursor": "not-a-cursor"}
+    )
+    assert response.status == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    "query_data, expected_fields",
+    [
+        ({"query": "Star", "page_size": 1}, {"uuid", "title", "imdb_rating"}),
+        (
+            {"query": "Star", "page_size": 1, "fields": "description,genre"},
+            {"uuid", "title", "imdb_rating", "description", "genre"},
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_search_fields_projection(
+    make_get_request, query_data: dict, expected_fields: set
+):
+    url = test_settings.service_url + api_url.api_v1_prefix + "films/search"
+    response = await make_get_request(url=url, query_data=query_data)
+    body = await response.json()
+    assert response.status == HTTPStatus.OK
+    assert set(body[0]) == expected_fields
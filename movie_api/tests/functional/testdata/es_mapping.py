@@ -50,7 +50,9 @@ MOVIES_MAPPING = {
                 "type": "text",
                 "analyzer": "ru_en",
                 "fields": {"raw": {"type": "keyword"}},
+                "copy_to": "title_suggest",
             },
+            "title_suggest": {"type": "search_as_you_type", "analyzer": "standard"},
             "description": {"type": "text", "analyzer": "ru_en"},
             "directors_names": {"type": "text", "analyzer": "ru_en"},
             "actors_names": {"type": "text", "analyzer": "ru_en"},
@@ -116,11 +118,16 @@ PERSONS_MAPPING = {
                 "type": "text",
                 "analyzer": "standard",
                 "fields": {"raw": {"type": "keyword"}},
+                "copy_to": "full_name_suggest",
             },
+            "full_name_suggest": {"type": "search_as_you_type", "analyzer": "standard"},
             "films": {
                 "type": "object",
+                "dynamic": "strict",
                 "properties": {
                     "uuid": {"type": "keyword"},
+                    "title": {"type": "text", "analyzer": "ru_en"},
+                    "imdb_rating": {"type": "float"},
                     "roles": {"type": "keyword"},
                 },
             },
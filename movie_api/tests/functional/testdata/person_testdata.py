@@ -1,23 +1,51 @@
 search_person_0 = {
     "uuid": "d8fc6948-6762-4a05-a87b-8c5eee203472",
     "full_name": "John Farrell",
-    "films": {"uuid": "68e9a139-976d-4a83-ad1b-e374376814c9", "roles": ["actors"]},
+    "films": [
+        {
+            "uuid": "68e9a139-976d-4a83-ad1b-e374376814c9",
+            "title": "The Star",
+            "imdb_rating": 6.6,
+            "roles": ["actors"],
+        }
+    ],
 }
 
 search_person_1 = {
     "uuid": "d8fc6948-6762-4a05-a87b-8c5eee203473",
     "full_name": "Pierce Brosnan",
-    "films": {"uuid": "542g4567-g73h-12d3-a456-426614174002", "roles": ["actors"]},
+    "films": [
+        {
+            "uuid": "542g4567-g73h-12d3-a456-426614174002",
+            "title": "Smashed potato",
+            "imdb_rating": 8.5,
+            "roles": ["actors"],
+        }
+    ],
 }
 
 search_person_2 = {
     "uuid": "d8fc6948-6762-4a05-a87b-8c5eee203475",
     "full_name": "Ivan Test",
-    "films": {"uuid": "542g4567-g73h-12d3-a456-426614174002", "roles": ["actors"]},
+    "films": [
+        {
+            "uuid": "542g4567-g73h-12d3-a456-426614174002",
+            "title": "Smashed potato",
+            "imdb_rating": 8.5,
+            "roles": ["actors"],
+        }
+    ],
 }
 
 search_person_3 = {
     "uuid": "d8fc6948-6762-4a05-a87b-8c5eee203476",
     "full_name": "Ivan Fest",
-    "films": {"uuid": "542g4567-g73h-12d3-a456-426614174002", "roles": ["actors"]},
+    "films": [
+        {
+            "uuid": "542g4567-g73h-12d3-a456-426614174002",
+            "title": "Smashed potato",
+            "imdb_rating": 8.5,
+            "roles": ["actors"],
+        }
+    ],
 }